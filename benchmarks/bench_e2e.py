@@ -0,0 +1,331 @@
+"""End-to-end benchmark: poll 1, 10 and 100 resources against the mock API.
+
+Sets up one account's coordinators and sensors in a bare Home Assistant
+instance pointed at ``mock_server.py`` and replays a simulated stretch of
+polling on a virtual clock, so an hour of adaptive polling runs in seconds
+while every request still goes over HTTP. The clock jumps ahead to each
+scheduled wake-up and otherwise runs at real speed, so the token bucket,
+retry delays and the mock's latency behave as they would live. The mock
+server runs on its own thread and is left out of the loop and CPU figures.
+For each scale it reports:
+
+- requests and bytes per simulated hour (response bodies / request lines)
+- wall-clock latency percentiles of one account update cycle
+- event-loop blocking time, measured as lag of a 5 ms ticker
+- CPU time per resource poll, including the sensor state reads it triggers
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_e2e.py [--scales 1 10 100] [--hours 1] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import contextlib
+import inspect
+import logging
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.config_entries import ConfigEntry  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+import custom_components.glowmarkt as glowmarkt  # noqa: E402
+from custom_components.glowmarkt import api, ratelimit, sensor  # noqa: E402
+from custom_components.glowmarkt.const import DOMAIN  # noqa: E402
+from custom_components.glowmarkt.hub import async_get_account, async_release_account  # noqa: E402
+from mock_server import MockGlowmarktServer  # noqa: E402
+
+TICK = 0.005
+
+
+class VirtualClock:
+    """Clock shared by the mock server and the integration under test."""
+
+    def __init__(self, start):
+        """Initialize the clock at ``start``."""
+        self._start = start
+        self._origin = time.monotonic()
+        self._skipped = timedelta()
+
+    @property
+    def now(self):
+        """Return the virtual UTC time."""
+        return self._start + self._skipped + timedelta(seconds=time.monotonic() - self._origin)
+
+    def time(self):
+        """Return the virtual Unix time."""
+        return self.now.timestamp()
+
+    def advance(self, delta):
+        """Skip ahead without waiting."""
+        self._skipped += delta
+
+    @contextlib.contextmanager
+    def patch(self):
+        """Make the integration read the virtual clock."""
+        clock = self
+
+        class VirtualDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock.now.astimezone(tz) if tz else clock.now.astimezone().replace(tzinfo=None)
+
+        virtual_time = SimpleNamespace(time=clock.time, monotonic=clock.time)
+        saved = glowmarkt.datetime, dt_util.utcnow, api.time, ratelimit.time
+        glowmarkt.datetime = VirtualDatetime
+        dt_util.utcnow = lambda: clock.now
+        api.time = ratelimit.time = virtual_time
+        try:
+            yield
+        finally:
+            glowmarkt.datetime, dt_util.utcnow, api.time, ratelimit.time = saved
+
+
+class ServerThread:
+    """Run the mock server on its own event loop and thread."""
+
+    def __init__(self, server):
+        """Initialize the thread."""
+        self.server = server
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    async def _call(self, coro):
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def start(self):
+        """Start the thread and server and return the base URL."""
+        self._thread.start()
+        return await self._call(self.server.start())
+
+    async def stop(self):
+        """Stop the server and the thread."""
+        await self._call(self.server.stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class LoopMonitor:
+    """Measure how long the event loop is blocked between ticks."""
+
+    def __init__(self):
+        """Initialize the monitor."""
+        self.blocked = 0.0
+        self.max_stall = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lag = time.perf_counter() - start - TICK
+            if lag > 0:
+                self.blocked += lag
+                self.max_stall = max(self.max_stall, lag)
+
+    def start(self):
+        """Start ticking."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop ticking."""
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def make_entry(resource_id, index):
+    """Return a config entry for one resource of the benchmark account."""
+    kwargs = {
+        "version": 1,
+        "domain": DOMAIN,
+        "title": f"Glowmarkt - bench {index}",
+        "data": {
+            "username": "bench@example.com",
+            "password": "bench",
+            "resource_id": resource_id,
+            "resource_type": "kWh",
+            "resource_name": "electricity consumption",
+        },
+        "source": "user",
+        "entry_id": f"bench{index}",
+    }
+    # 不同 Home Assistant 版本的 ConfigEntry 必填参数不同
+    parameters = inspect.signature(ConfigEntry.__init__).parameters
+    if "minor_version" in parameters:
+        kwargs["minor_version"] = 1
+    if "options" in parameters:
+        kwargs["options"] = {}
+    return ConfigEntry(**kwargs)
+
+
+async def run_scale(resources, args):
+    """Benchmark one account with ``resources`` resources."""
+    start = datetime.now(timezone.utc).replace(hour=args.start_hour, minute=3, second=0, microsecond=0)
+    clock = VirtualClock(start)
+    server = MockGlowmarktServer(
+        resources=resources,
+        latency=args.latency,
+        jitter=args.latency / 2,
+        late_fraction=args.late_fraction,
+        unauthorized_rate=args.unauthorized_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        clock=clock.time,
+    )
+    server_thread = ServerThread(server)
+    base_url = await server_thread.start()
+    saved_settings = api.API_URL, api.AUTH_URL, api.REQUEST_RATE, api.REQUEST_BURST
+    api.API_URL, api.AUTH_URL = base_url, f"{base_url}/auth"
+    if args.request_rate:
+        # 账户限速决定了大规模时的实际耗时，放开后便于快速比较
+        api.REQUEST_RATE = api.REQUEST_BURST = args.request_rate
+
+    state_writes = 0
+
+    with tempfile.TemporaryDirectory() as config_dir, clock.patch():
+        hass = HomeAssistant(config_dir)
+        hass.data[DOMAIN] = {}
+        try:
+            coordinators = []
+            for index, resource_id in enumerate(server.resource_ids):
+                entry = make_entry(resource_id, index)
+                account = await async_get_account(hass, entry)
+                coordinator = glowmarkt.GlowmarktDataUpdateCoordinator(hass, entry, account)
+                hass.data[DOMAIN][entry.entry_id] = coordinator
+                entities = []
+                await sensor.async_setup_entry(hass, entry, entities.extend)
+                # 默认禁用的诊断传感器不会写入状态
+                entities = [entity for entity in entities if entity.entity_registry_enabled_default]
+
+                def write_state(entities=entities):
+                    # 与实体写入状态时读取的属性相同
+                    nonlocal state_writes
+                    for entity in entities:
+                        entity.available
+                        entity.native_value
+                        entity.extra_state_attributes
+                        state_writes += 1
+
+                coordinator.async_add_listener(write_state)
+                # 直接挂到账户上，避免账户协调器的真实定时器参与调度
+                account.coordinators[entry.entry_id] = coordinator
+                coordinators.append(coordinator)
+
+            monitor = LoopMonitor()
+            monitor.start()
+
+            # 首次同步：整天数据、电价和资源发现
+            first_cycle = time.perf_counter()
+            await account.coordinator.async_refresh()
+            first_cycle = time.perf_counter() - first_cycle
+            initial_requests = server.total_requests
+            server.reset_stats()
+            clock.advance(account.coordinator.update_interval)
+            monitor.blocked = monitor.max_stall = 0.0
+
+            latencies, cpu, polls, cycles = [], 0.0, 0, 0
+            end = start + timedelta(hours=args.hours)
+            while clock.now < end:
+                wall, cpu_start = time.perf_counter(), time.thread_time()
+                await account.coordinator.async_refresh()
+                latencies.append(time.perf_counter() - wall)
+                cpu += time.thread_time() - cpu_start
+                polls += len(account.coordinator.data["polled"]) if account.coordinator.data else 0
+                cycles += 1
+                clock.advance(account.coordinator.update_interval)
+
+            await monitor.stop()
+            failed = sum(not c.last_update_success for c in coordinators)
+        finally:
+            for index in range(resources):
+                async_release_account(hass, make_entry(server.resource_ids[index], index))
+            api.API_URL, api.AUTH_URL, api.REQUEST_RATE, api.REQUEST_BURST = saved_settings
+            await server_thread.stop()
+            await hass.async_stop(force=True)
+
+    per_hour = 1 / args.hours
+    return {
+        "resources": resources,
+        "first_cycle_ms": first_cycle * 1000,
+        "initial_requests": initial_requests,
+        "cycles": cycles,
+        "requests_per_hour": server.total_requests * per_hour,
+        "by_endpoint": dict(server.requests),
+        "statuses": dict(server.statuses),
+        "kib_in_per_hour": server.bytes_sent * per_hour / 1024,
+        "kib_out_per_hour": server.bytes_received * per_hour / 1024,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else 0,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else 0,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else 0,
+        "blocked_ms_per_cycle": monitor.blocked * 1000 / max(cycles, 1),
+        "max_stall_ms": monitor.max_stall * 1000,
+        "cpu_ms_per_poll": cpu * 1000 / max(polls, 1),
+        "polls": polls,
+        "state_writes": state_writes,
+        "failed": failed,
+    }
+
+
+def print_result(result):
+    """Print one scale's results."""
+    print(f"resources: {result['resources']}")
+    print(f"  initial sync:           {result['initial_requests']} requests, {result['first_cycle_ms']:.1f} ms")
+    print(
+        f"  update cycles:          {result['cycles']} "
+        f"({result['polls']} resource polls, {result['state_writes']} sensor state writes)"
+    )
+    print(f"  requests/hour:          {result['requests_per_hour']:.0f} {result['by_endpoint']}")
+    print(f"  responses:              {result['statuses']}")
+    print(f"  KiB/hour in / out:      {result['kib_in_per_hour']:.1f} / {result['kib_out_per_hour']:.1f}")
+    print(
+        f"  cycle latency p50/p95/p99: "
+        f"{result['p50_ms']:.1f} / {result['p95_ms']:.1f} / {result['p99_ms']:.1f} ms"
+    )
+    print(f"  loop blocked per cycle: {result['blocked_ms_per_cycle']:.2f} ms (max stall {result['max_stall_ms']:.2f} ms)")
+    print(f"  CPU per resource poll:  {result['cpu_ms_per_poll']:.2f} ms")
+    if result["failed"]:
+        print(f"  failed coordinators:    {result['failed']}")
+
+
+async def async_main(args):
+    """Run every scale in turn."""
+    for resources in args.scales:
+        print_result(await run_scale(resources, args))
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="resources per run")
+    parser.add_argument("--hours", type=float, default=1.0, help="simulated polling time")
+    parser.add_argument("--start-hour", type=int, default=18, help="UTC hour the simulation starts at")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock API latency in seconds")
+    parser.add_argument("--late-fraction", type=float, default=0.05, help="share of buckets uploaded late")
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0, help="probability of a 401")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="probability of a 429")
+    parser.add_argument(
+        "--request-rate", type=float, default=None, help="override the client's requests per second and burst"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(async_main(args))
+
+
+if __name__ == "__main__":
+    main()
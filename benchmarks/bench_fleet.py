@@ -0,0 +1,167 @@
+"""Fleet benchmark: request rate of many accounts polling one API.
+
+Sets up ``--accounts`` Bright accounts with one resource each against
+``mock_server.py`` and replays a simulated stretch of polling on the virtual
+clock from ``bench_e2e.py``. Each account coordinator wakes at the time it
+scheduled for itself. The run is repeated with every account on the same
+phase, as when each coordinator started its own timer at setup, and with the
+phase offsets of the fleet scheduler. For each it reports:
+
+- mean and peak requests per second, and the 99th percentile second
+- the deepest queue for the global in-flight request cap
+- how late account cycles started and how long requests waited for a slot
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_fleet.py [--accounts 10 50] [--hours 1] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+import custom_components.glowmarkt as glowmarkt  # noqa: E402
+from custom_components.glowmarkt import api  # noqa: E402
+from custom_components.glowmarkt.const import DATA_FLEET, DOMAIN  # noqa: E402
+from custom_components.glowmarkt.hub import async_get_account, async_release_account  # noqa: E402
+from custom_components.glowmarkt.metrics import Histogram  # noqa: E402
+from bench_e2e import ServerThread, VirtualClock, make_entry, percentile  # noqa: E402
+from mock_server import MockGlowmarktServer  # noqa: E402
+
+
+def make_account_entry(resource_id, index):
+    """Return a config entry for the only resource of account ``index``."""
+    entry = make_entry(resource_id, index)
+    # 每个条目使用不同的账户
+    entry.data = {**entry.data, "username": f"bench{index}@example.com"}
+    return entry
+
+
+def wake_of(account, clock):
+    """Return when an account coordinator asked to run next."""
+    coordinator = account.coordinator
+    if coordinator.expected_wake is None:
+        # 上一轮失败时没有计划时间，按固定间隔重试
+        return clock.now + coordinator.update_interval
+    return coordinator.expected_wake
+
+
+async def run_fleet(accounts, phased, args):
+    """Benchmark ``accounts`` accounts with or without phase offsets."""
+    start = datetime.now(timezone.utc).replace(hour=args.start_hour, minute=3, second=0, microsecond=0)
+    clock = VirtualClock(start)
+    server = MockGlowmarktServer(
+        resources=accounts, latency=args.latency, jitter=args.latency / 2, clock=clock.time
+    )
+    server_thread = ServerThread(server)
+    base_url = await server_thread.start()
+    saved_settings = api.API_URL, api.AUTH_URL
+    api.API_URL, api.AUTH_URL = base_url, f"{base_url}/auth"
+
+    with tempfile.TemporaryDirectory() as config_dir, clock.patch():
+        hass = HomeAssistant(config_dir)
+        hass.data[DOMAIN] = {}
+        entries = []
+        try:
+            hubs = []
+            for index, resource_id in enumerate(server.resource_ids):
+                entry = make_account_entry(resource_id, index)
+                entries.append(entry)
+                account = await async_get_account(hass, entry)
+                coordinator = glowmarkt.GlowmarktDataUpdateCoordinator(hass, entry, account)
+                hass.data[DOMAIN][entry.entry_id] = coordinator
+                # 直接挂到账户上，由下面的循环按各账户计划的时间唤醒
+                account.coordinators[entry.entry_id] = coordinator
+                hubs.append(account)
+            fleet = hass.data[DOMAIN][DATA_FLEET]
+            if not phased:
+                # 同一相位：相当于每个协调器在启动时各自开始计时
+                fleet.phase = lambda key: 0.0
+
+            # 首次同步不计入统计
+            await asyncio.gather(*(account.coordinator.async_refresh() for account in hubs))
+            server.reset_stats()
+            fleet.lag, fleet.wait = Histogram(), Histogram()
+            fleet.max_queued = 0
+            measured_from = clock.time()
+
+            end = start + timedelta(hours=args.hours)
+            while True:
+                wakes = [wake_of(account, clock) for account in hubs]
+                if min(wakes) >= end:
+                    break
+                if min(wakes) > clock.now:
+                    clock.advance(min(wakes) - clock.now)
+                due = [account for account, wake in zip(hubs, wakes) if wake <= clock.now]
+                await asyncio.gather(*(account.coordinator.async_refresh() for account in due))
+            failed = sum(not account.coordinator.last_update_success for account in hubs)
+            measured = clock.time() - measured_from
+        finally:
+            for entry in entries:
+                async_release_account(hass, entry)
+            api.API_URL, api.AUTH_URL = saved_settings
+            await server_thread.stop()
+            await hass.async_stop(force=True)
+
+    per_second = Counter(int(ts) for ts in server.request_times)
+    seconds = [per_second.get(second, 0) for second in range(int(measured_from), int(measured_from + measured) + 1)]
+    return {
+        "accounts": accounts,
+        "phased": phased,
+        "requests": len(server.request_times),
+        "mean_rps": len(server.request_times) / max(measured, 1),
+        "peak_rps": max(seconds, default=0),
+        "p99_rps": percentile(seconds, 99) if seconds else 0,
+        "busy_seconds": sum(1 for count in seconds if count),
+        "max_queued": fleet.max_queued,
+        "lag_p95": fleet.lag.quantile(0.95) or 0,
+        "wait_p95": fleet.wait.quantile(0.95) or 0,
+        "failed": failed,
+    }
+
+
+def print_result(result):
+    """Print one run's results."""
+    mode = "phased" if result["phased"] else "same phase"
+    print(f"accounts: {result['accounts']} ({mode})")
+    print(f"  requests:               {result['requests']}")
+    print(
+        f"  requests/s mean/p99/peak: {result['mean_rps']:.2f} / {result['p99_rps']} / {result['peak_rps']} "
+        f"({result['busy_seconds']} seconds with requests)"
+    )
+    print(f"  max queued for a slot:  {result['max_queued']}")
+    print(f"  p95 cycle lag / slot wait: {result['lag_p95'] * 1000:.0f} / {result['wait_p95'] * 1000:.0f} ms")
+    if result["failed"]:
+        print(f"  failed accounts:        {result['failed']}")
+
+
+async def async_main(args):
+    """Run every fleet size with and without phases."""
+    for accounts in args.accounts:
+        for phased in (False, True):
+            print_result(await run_fleet(accounts, phased, args))
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10, 50], help="accounts per run")
+    parser.add_argument("--hours", type=float, default=1.0, help="simulated polling time")
+    parser.add_argument("--start-hour", type=int, default=18, help="UTC hour the simulation starts at")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock API latency in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(async_main(args))
+
+
+if __name__ == "__main__":
+    main()
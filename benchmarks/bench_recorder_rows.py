@@ -0,0 +1,187 @@
+"""Benchmark: recorder rows written per day by the Glowmarkt sensors.
+
+Replays a simulated day of one-minute coordinator refreshes for a number of
+meters in a bare Home Assistant instance and counts what the recorder would
+store. Readings come from ``mock_server.py``'s synthetic series without going
+over HTTP, so only the coordinator, snapshot and sensor code is exercised.
+Each run is repeated twice:
+
+- ``before``: every refresh notifies every sensor, every sensor writes its
+  state and all attributes are recorded, as before change detection
+- ``after``: unchanged snapshots are not broadcast, sensors skip writes that
+  only touch volatile attributes and those attributes are not recorded
+
+It reports state writes, ``states`` rows (one per ``state_changed`` event) and
+distinct ``state_attributes`` rows, per meter and day.
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_recorder_rows.py [--meters 10] [--hours 24]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.components.recorder.const import ALL_DOMAIN_EXCLUDE_ATTRS  # noqa: E402
+from homeassistant.const import EVENT_STATE_CHANGED  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.util import slugify  # noqa: E402
+
+import custom_components.glowmarkt as glowmarkt  # noqa: E402
+from custom_components.glowmarkt import sensor  # noqa: E402
+from custom_components.glowmarkt.const import DOMAIN  # noqa: E402
+from custom_components.glowmarkt.hub import async_get_account, async_release_account  # noqa: E402
+from bench_e2e import VirtualClock, make_entry  # noqa: E402
+from mock_server import MockGlowmarktServer  # noqa: E402
+
+# Economy 7：夜间时段让电价传感器一天内变化两次
+TARIFF = {
+    "name": "Economy 7",
+    "type": "standard",
+    "from": "2024-01-01T00:00:00",
+    "source": {"value": "DCC"},
+    "currentRates": {"rate": 30.5, "standingCharge": 53.35},
+    "plan": [
+        {
+            "planDetail": [
+                {"tier": 1, "rate": 30.5},
+                {"tier": 2, "rate": 13.2, "startTime": "00:30", "endTime": "07:30"},
+            ]
+        }
+    ],
+}
+
+
+def feed_coordinator(coordinator, server, clock):
+    """Replace the coordinator's API calls with the mock series on ``clock``."""
+
+    async def get_usage_data():
+        now = clock.now
+        coordinator._ensure_day(now)
+        for ts, value in server.readings(coordinator.resource_id, coordinator._day_start.timestamp(), now.timestamp()):
+            coordinator._day.update(ts, value)
+        return coordinator._day.series()
+
+    async def get_tariff_data():
+        return {"data": [TARIFF]}
+
+    async def reconcile(now, today):
+        return None
+
+    coordinator._get_usage_data = get_usage_data
+    coordinator._get_tariff_data = get_tariff_data
+    coordinator.rollup.async_reconcile = reconcile
+
+
+async def run(meters, baseline, args):
+    """Simulate ``args.hours`` of refreshes; return write and row counts."""
+    start = datetime.now(timezone.utc).replace(hour=1, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    clock = VirtualClock(start)
+    server = MockGlowmarktServer(resources=meters, late_fraction=args.late_fraction, clock=clock.time)
+    counts = {"notifications": 0, "writes": 0, "states": 0}
+    attribute_rows = set()
+    unrecorded = {}
+
+    with tempfile.TemporaryDirectory() as config_dir, clock.patch():
+        hass = HomeAssistant(config_dir)
+        hass.data[DOMAIN] = {}
+
+        def state_changed(event):
+            # 每个 state_changed 事件对应 states 表的一行，属性按内容去重
+            new_state = event.data["new_state"]
+            excluded = ALL_DOMAIN_EXCLUDE_ATTRS | unrecorded[new_state.entity_id]
+            recorded = {key: value for key, value in new_state.attributes.items() if key not in excluded}
+            counts["states"] += 1
+            attribute_rows.add(json.dumps(recorded, sort_keys=True, default=str))
+
+        hass.bus.async_listen(EVENT_STATE_CHANGED, state_changed)
+        entries = []
+        try:
+            coordinators = []
+            for index, resource_id in enumerate(server.resource_ids):
+                entry = make_entry(resource_id, index)
+                entries.append(entry)
+                account = await async_get_account(hass, entry)
+                coordinator = glowmarkt.GlowmarktDataUpdateCoordinator(hass, entry, account)
+                coordinator.always_update = baseline
+                feed_coordinator(coordinator, server, clock)
+                hass.data[DOMAIN][entry.entry_id] = coordinator
+                entities = []
+                await sensor.async_setup_entry(hass, entry, entities.extend)
+                for entity in entities:
+                    if not entity.entity_registry_enabled_default:
+                        continue
+                    entity.hass = hass
+                    entity.entity_id = f"sensor.{slugify(entity.unique_id)}"
+                    unrecorded[entity.entity_id] = frozenset() if baseline else entity._unrecorded_attributes
+
+                    def count_write(original=entity.async_write_ha_state):
+                        counts["writes"] += 1
+                        original()
+
+                    entity.async_write_ha_state = count_write
+                    write = entity.async_write_ha_state if baseline else entity._handle_coordinator_update
+
+                    def listener(write=write):
+                        counts["notifications"] += 1
+                        write()
+
+                    coordinator.async_add_listener(listener)
+                coordinators.append(coordinator)
+
+            end = start + timedelta(hours=args.hours)
+            while clock.now < end:
+                for coordinator in coordinators:
+                    await coordinator.async_refresh()
+                await hass.async_block_till_done()
+                clock.advance(timedelta(minutes=1))
+        finally:
+            for entry in entries:
+                async_release_account(hass, entry)
+            await hass.async_stop(force=True)
+
+    per_meter_day = 24 / args.hours / meters
+    return {
+        "notifications": counts["notifications"] * per_meter_day,
+        "writes": counts["writes"] * per_meter_day,
+        "states": counts["states"] * per_meter_day,
+        "attributes": len(attribute_rows) * per_meter_day,
+    }
+
+
+async def async_main(args):
+    """Run the baseline and the current behaviour and print both."""
+    before = await run(args.meters, True, args)
+    after = await run(args.meters, False, args)
+    print(f"meters: {args.meters}, simulated hours: {args.hours:g} (figures per meter per day)")
+    print(f"{'':28}{'before':>10}{'after':>10}")
+    for key, label in (
+        ("notifications", "sensor notifications"),
+        ("writes", "state writes"),
+        ("states", "states rows"),
+        ("attributes", "state_attributes rows"),
+    ):
+        print(f"{label:28}{before[key]:10.0f}{after[key]:10.0f}")
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meters", type=int, default=10, help="resources to simulate")
+    parser.add_argument("--hours", type=float, default=24.0, help="simulated time")
+    parser.add_argument("--late-fraction", type=float, default=0.05, help="share of buckets uploaded late")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(async_main(args))
+
+
+if __name__ == "__main__":
+    main()
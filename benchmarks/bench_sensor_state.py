@@ -0,0 +1,171 @@
+"""Micro-benchmark: cost of one state write for every Glowmarkt sensor.
+
+Compares the pre-snapshot property code, which re-derived values from the
+coordinator dict on every read, with the current sensors that read a
+precomputed ``GlowmarktSnapshot``.
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_sensor_state.py [--buckets 48] [--number 20000]
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.glowmarkt import GlowmarktDataUpdateCoordinator, sensor  # noqa: E402
+from custom_components.glowmarkt.pricing import compile_schedule  # noqa: E402
+from custom_components.glowmarkt.series import ReadingSeries  # noqa: E402
+from custom_components.glowmarkt.snapshot import build_snapshot  # noqa: E402
+
+TARIFF = {
+    "name": "Flexible",
+    "type": "standard",
+    "from": "2024-01-01T00:00:00",
+    "source": {"value": "DCC"},
+    "currentRates": {"rate": 24.5, "standingCharge": 53.35},
+    "plan": [{"planDetail": [{"tier": 1, "rate": 24.5}, {"tier": 2, "rate": 12.1}]}],
+}
+
+
+def legacy_state_write(data):
+    """Replay the property logic sensor.py used before snapshots."""
+    now = datetime.now(timezone.utc).timestamp()
+
+    # 30 Minute Usage: linear scan for the closest non-zero bucket
+    closest_value = closest_diff = closest_ts = None
+    for timestamp, value in data["readings"]:
+        if value == 0:
+            continue
+        diff = abs(timestamp - now)
+        if closest_diff is None or diff < closest_diff:
+            closest_diff, closest_value, closest_ts = diff, value, timestamp
+    period_attrs = {
+        "latest_reading_time": datetime.fromtimestamp(closest_ts, tz=timezone.utc).strftime("%H:%M") + " (UTC)",
+        "units": data.get("units", "kWh"),
+    }
+
+    # Cumulative Usage
+    cumulative = data.get("cumulative")
+    cumulative_attrs = {
+        "timestamp": datetime.fromtimestamp(data["timestamp"], tz=timezone.utc).strftime("%Y-%m-%d %H:%M (UTC)"),
+        "units": data.get("units"),
+    }
+
+    # Electricity Cost: available check, value and attributes
+    tariff = data["tariff"]
+    available = tariff is not None and data.get("cumulative") is not None
+    standing_charge = tariff.get("currentRates", {}).get("standingCharge", 0) / 100
+    rate = tariff.get("currentRates", {}).get("rate", 0) / 100
+    cost = round(standing_charge + cumulative * rate, 2) if available else None
+    standing_charge = tariff.get("currentRates", {}).get("standingCharge", 0) / 100
+    rate = tariff.get("currentRates", {}).get("rate", 0) / 100
+    cost_attrs = {
+        "standing_charge": standing_charge,
+        "rate_per_kwh": rate,
+        "daily_usage_kwh": round(cumulative, 3),
+        "cost_breakdown": {"standing_charge": standing_charge, "usage_cost": round(cumulative * rate, 2)},
+        "calculation_date": datetime.now().strftime("%Y-%m-%d"),
+        "tariff_name": tariff.get("name"),
+    }
+
+    # Standing Charge
+    raw = tariff.get("currentRates", {}).get("standingCharge")
+    standing = round(raw / 100, 2) if raw is not None else None
+    standing_attrs = {
+        "tariff_name": tariff.get("name"),
+        "tariff_type": tariff.get("type"),
+        "valid_from": tariff.get("from"),
+        "source": tariff.get("source", {}).get("value"),
+    }
+
+    # Rate
+    raw = tariff.get("currentRates", {}).get("rate")
+    rate_value = round(raw / 100, 4) if raw is not None else None
+    tiers = {}
+    for detail in tariff.get("plan", [{}])[0].get("planDetail", []):
+        if "rate" in detail:
+            tiers[f"tier_{detail.get('tier', 1)}"] = detail["rate"] / 100
+
+    return (
+        closest_value, period_attrs, cumulative, cumulative_attrs, cost, cost_attrs,
+        standing, standing_attrs, rate_value, tiers,
+    )
+
+
+def make_readings(buckets):
+    """Return half-hour readings ending at the current half hour."""
+    now = int(datetime.now(timezone.utc).timestamp())
+    end = now - now % 1800
+    return [[float(end - (buckets - i) * 1800), 0.0 if i % 7 == 0 else 0.1 + (i % 5) * 0.05] for i in range(buckets)]
+
+
+def main():
+    """Run the benchmark and print a summary."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buckets", type=int, default=48, help="half-hour buckets in coordinator data")
+    parser.add_argument("--number", type=int, default=20000, help="state writes per measurement")
+    args = parser.parse_args()
+
+    readings = make_readings(args.buckets)
+    legacy_data = {
+        "readings": readings,
+        "timestamp": readings[-1][0],
+        "units": "kWh",
+        "cumulative": sum(value for _, value in readings),
+        "resource_type": "kWh",
+        "tariff": TARIFF,
+    }
+
+    series = ReadingSeries.from_pairs(readings)
+    snapshot = build_snapshot(series, "kWh", "kWh", TARIFF)
+    coordinator = SimpleNamespace(
+        data=snapshot, resource_type="kWh", last_update_success=True, max_staleness=timedelta(hours=3)
+    )
+    # 数据年龄属性走协调器的真实实现
+    coordinator.data_age = GlowmarktDataUpdateCoordinator.data_age.__get__(coordinator)
+    entry = SimpleNamespace(entry_id="bench", data={"resource_id": "bench"})
+    sensors = [
+        cls(coordinator, entry)
+        for cls in (
+            sensor.GlowmarktPeriodUsageSensor,
+            sensor.GlowmarktCumulativeUsageSensor,
+            sensor.ElectricityCostSensor,
+            sensor.ElectricityStandingChargeSensor,
+            sensor.ElectricityRateSensor,
+        )
+    ]
+
+    def snapshot_state_write():
+        for entity in sensors:
+            entity.available
+            entity.native_value
+            entity.extra_state_attributes
+
+    legacy = min(timeit.repeat(lambda: legacy_state_write(legacy_data), number=args.number, repeat=5))
+    current = min(timeit.repeat(snapshot_state_write, number=args.number, repeat=5))
+    # 协调器只在电价变化时编译时段表，用量成本随桶增量维护
+    schedule = compile_schedule(TARIFF)
+    usage_cost = schedule.usage_cost(series)
+    build = min(
+        timeit.repeat(
+            lambda: build_snapshot(series, "kWh", "kWh", TARIFF, schedule=schedule, usage_cost=usage_cost),
+            number=args.number,
+            repeat=5,
+        )
+    )
+
+    per = 1e6 / args.number
+    print(f"buckets per day:                     {args.buckets}")
+    print(f"legacy state write (5 sensors):      {legacy * per:8.2f} us")
+    print(f"snapshot state write (5 sensors):    {current * per:8.2f} us")
+    print(f"snapshot build (once per update):    {build * per:8.2f} us")
+    print(f"speed-up per state write:            {legacy / current:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
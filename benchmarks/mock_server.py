@@ -0,0 +1,287 @@
+"""Local stand-in for the Glowmarkt API used by the benchmarks.
+
+Serves ``/auth``, ``/resource`` and the per-resource ``readings``,
+``catchup``, ``current`` and ``tariff`` endpoints with synthetic
+half-hour series. Latency, 401s, 429s and late-arriving buckets are
+configurable so the integration's retry, repair and adaptive polling
+paths can be exercised.
+
+It can also be run on its own and used by a development Home Assistant
+instance:
+
+    python benchmarks/mock_server.py --port 8080 --resources 10 --latency 0.2
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+BUCKET_SECONDS = 30 * 60
+
+# 典型家庭的日内用电曲线（kWh / 半小时，按小时）
+DAILY_PROFILE = (
+    0.12, 0.10, 0.09, 0.09, 0.09, 0.10, 0.18, 0.32, 0.35, 0.25, 0.20, 0.20,
+    0.24, 0.22, 0.20, 0.22, 0.30, 0.45, 0.55, 0.50, 0.42, 0.35, 0.25, 0.16,
+)
+
+TARIFF = {
+    "name": "Flexible",
+    "type": "standard",
+    "from": "2024-01-01T00:00:00",
+    "source": {"value": "DCC"},
+    "currentRates": {"rate": 24.5, "standingCharge": 53.35},
+    "plan": [{"planDetail": [{"tier": 1, "rate": 24.5}]}],
+}
+
+
+def _parse_time(value):
+    """Parse an API ``YYYY-MM-DDTHH:MM:SS`` timestamp as UTC."""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+
+
+class MockGlowmarktServer:
+    """Synthetic Glowmarkt API backed by an aiohttp application.
+
+    ``clock`` returns the current Unix time and may be a virtual clock, so a
+    simulated hour of polling runs in seconds. A bucket becomes visible
+    ``upload_delay`` seconds after it ends; a ``late_fraction`` of buckets
+    arrives ``late_delay`` seconds later still and reads as 0 until then,
+    like a meter that missed an upload. ``unauthorized_rate`` and
+    ``rate_limit_rate`` are the probabilities of answering a data request
+    with 401 or 429.
+    """
+
+    def __init__(
+        self,
+        resources=1,
+        latency=0.0,
+        jitter=0.0,
+        upload_delay=120,
+        late_fraction=0.0,
+        late_delay=2 * 3600,
+        unauthorized_rate=0.0,
+        rate_limit_rate=0.0,
+        retry_after=1,
+        token_lifetime=7 * 24 * 3600,
+        clock=time.time,
+        seed=0,
+    ):
+        """Initialize the server state."""
+        self.resource_ids = [str(uuid.UUID(int=i + 1)) for i in range(resources)]
+        self.latency = latency
+        self.jitter = jitter
+        self.upload_delay = upload_delay
+        self.late_fraction = late_fraction
+        self.late_delay = late_delay
+        self.unauthorized_rate = unauthorized_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.token_lifetime = token_lifetime
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._seed = seed
+        self._tokens = set()
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.request_times = []
+        self._runner = None
+
+    def reset_stats(self):
+        """Clear the request, status and byte counters."""
+        self.requests.clear()
+        self.statuses.clear()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.request_times.clear()
+
+    @property
+    def total_requests(self):
+        """Return the number of requests served since the last reset."""
+        return sum(self.requests.values())
+
+    def _bucket(self, resource_id, ts):
+        """Return ``(value, published_at)`` for one half-hour bucket."""
+        digest = hashlib.blake2b(f"{self._seed}:{resource_id}:{ts}".encode(), digest_size=8).digest()
+        rng = random.Random(digest)
+        hour = datetime.fromtimestamp(ts, tz=timezone.utc).hour
+        value = round(DAILY_PROFILE[hour] * rng.uniform(0.6, 1.4), 3)
+        published_at = ts + BUCKET_SECONDS + self.upload_delay
+        if rng.random() < self.late_fraction:
+            published_at += self.late_delay
+        return value, published_at
+
+    def readings(self, resource_id, start_ts, end_ts):
+        """Return ``[timestamp, value]`` pairs as the API would right now."""
+        now = self.clock()
+        first = int(start_ts) - int(start_ts) % BUCKET_SECONDS
+        data = []
+        for ts in range(first, int(end_ts) + 1, BUCKET_SECONDS):
+            if ts >= now:
+                break
+            value, published_at = self._bucket(resource_id, ts)
+            # 尚未上传的桶和真实 API 一样返回 0
+            data.append([ts, value if published_at <= now else 0])
+        return data
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        """Apply latency and record requests, statuses and bytes."""
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        self.requests[request.path.rstrip("/").rsplit("/", 1)[-1]] += 1
+        self.request_times.append(self.clock())
+        self.bytes_received += len(request.path_qs) + (request.content_length or 0)
+        response = await handler(request)
+        self.statuses[response.status] += 1
+        if response.body is not None:
+            self.bytes_sent += len(response.body)
+        return response
+
+    def _check_request(self, request):
+        """Return an error response for a rejected or throttled request, or None."""
+        header = request.headers.get("Authorization", "")
+        token = header.removeprefix("Bearer ") if header else request.headers.get("token")
+        if token not in self._tokens or self._random.random() < self.unauthorized_rate:
+            self._tokens.discard(token)
+            return web.json_response({"error": "Unauthorized"}, status=401)
+        if self._random.random() < self.rate_limit_rate:
+            return web.json_response(
+                {"error": "Too Many Requests"}, status=429, headers={"Retry-After": str(self.retry_after)}
+            )
+        return None
+
+    async def _auth(self, request):
+        """Issue a token."""
+        token = uuid.uuid4().hex
+        self._tokens.add(token)
+        return web.json_response(
+            {"valid": True, "token": token, "exp": int(self.clock() + self.token_lifetime)}
+        )
+
+    async def _resources(self, request):
+        """List the account's resources."""
+        if (error := self._check_request(request)) is not None:
+            return error
+        return web.json_response(
+            [
+                {
+                    "resourceId": resource_id,
+                    "name": "electricity consumption",
+                    "baseUnit": "kWh",
+                    "resourceTypeId": "ea02304a-2820-4ea0-8399-f1d1b430c3a0",
+                }
+                for resource_id in self.resource_ids
+            ]
+        )
+
+    async def _readings(self, request):
+        """Return half-hour readings between ``from`` and ``to``."""
+        if (error := self._check_request(request)) is not None:
+            return error
+        try:
+            start_ts = _parse_time(request.query["from"])
+            end_ts = _parse_time(request.query["to"])
+        except (KeyError, ValueError):
+            return web.json_response({"error": "Bad Request"}, status=400)
+        data = self.readings(request.match_info["resource_id"], start_ts, end_ts)
+        return web.json_response({"data": data, "units": "kWh", "resourceId": request.match_info["resource_id"]})
+
+    async def _catchup(self, request):
+        """Return the last day of readings."""
+        if (error := self._check_request(request)) is not None:
+            return error
+        now = self.clock()
+        data = self.readings(request.match_info["resource_id"], now - 24 * 3600, now)
+        return web.json_response({"data": data, "units": "kWh"})
+
+    async def _current(self, request):
+        """Return the instantaneous power implied by the current bucket."""
+        if (error := self._check_request(request)) is not None:
+            return error
+        now = int(self.clock())
+        bucket = now - now % BUCKET_SECONDS
+        value, _ = self._bucket(request.match_info["resource_id"], bucket)
+        # 半小时 kWh 换算为平均功率（W）
+        return web.json_response({"data": [[now, round(value * 2000, 1)]], "units": "W"})
+
+    async def _tariff(self, request):
+        """Return the tariff, honouring ``If-None-Match``."""
+        if (error := self._check_request(request)) is not None:
+            return error
+        body = json.dumps({"data": [TARIFF]})
+        etag = '"' + hashlib.blake2b(body.encode(), digest_size=8).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    def make_app(self):
+        """Return the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/auth", self._auth)
+        app.router.add_get("/resource", self._resources)
+        app.router.add_get("/resource/{resource_id}/readings", self._readings)
+        app.router.add_get("/resource/{resource_id}/catchup", self._catchup)
+        app.router.add_get("/resource/{resource_id}/tariff", self._tariff)
+        app.router.add_get("/resource/{resource_id}/current", self._current)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(args):
+    """Run the server until interrupted."""
+    server = MockGlowmarktServer(
+        resources=args.resources,
+        latency=args.latency,
+        late_fraction=args.late_fraction,
+        unauthorized_rate=args.unauthorized_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+    base_url = await server.start(args.host, args.port)
+    print(f"Mock Glowmarkt API on {base_url} with resources {', '.join(server.resource_ids)}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    """Parse arguments and serve."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--resources", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--late-fraction", type=float, default=0.05, help="share of buckets uploaded late")
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0, help="probability of a 401")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="probability of a 429")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,126 +1,298 @@
 """The Glowmarkt integration."""
+import asyncio
+import dataclasses
 import logging
-import requests
+import time
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
-    DEFAULT_SCAN_INTERVAL,
-    BRIGHT_APP_ID,
-    CONF_USERNAME,
-    CONF_PASSWORD,
-    API_URL,
-    AUTH_URL
+    FAST_POLL_INTERVAL,
+    READINGS_RECHECK_MARGIN,
+    BUCKET_SECONDS,
+    CONF_TARIFF_TTL,
+    DEFAULT_TARIFF_TTL,
+    CONF_MQTT_TOPIC,
+    CONF_POWER_INTERVAL,
+    DEFAULT_POWER_INTERVAL,
+    MIN_POWER_INTERVAL,
+    CONF_MAX_STALENESS,
+    DEFAULT_MAX_STALENESS,
+    PUSH_RECONCILE_INTERVAL,
+    PUSH_STALE_AFTER,
+    SLOTS_PER_DAY,
 )
+from .gaps import DayReadings
+from .hub import GlowmarktAccount, async_get_account, async_release_account
+from .metrics import UpdateMetrics
+from .power import GlowmarktPowerCoordinator
+from .pricing import compile_schedule
+from .push import MqttPushSource, is_gas_resource, meter_topic
+from .rollup import RollupCache
+from .scheduler import AdaptivePollScheduler
+from .services import async_setup_services
+from .snapshot import build_snapshot
+from .statistics import StatisticsWriter
+from .store import ReadingStore
+from .tariff import TariffCache
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor"]
 
 
+def _iter_pairs(items):
+    """Yield ``(timestamp, value)`` from API ``[timestamp, value]`` lists."""
+    for item in items:
+        if isinstance(item, list) and len(item) >= 2:
+            yield item[0], item[1]
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Glowmarkt from a config entry."""
-    coordinator = GlowmarktDataUpdateCoordinator(hass, entry)
-    await coordinator.async_config_entry_first_refresh()
+    account = await async_get_account(hass, entry)
+    coordinator = GlowmarktDataUpdateCoordinator(hass, entry, account)
+
+    restored = await coordinator.async_restore()
+    if restored is not None:
+        # 用本地快照立即注册实体，云端刷新放到后台
+        coordinator.async_set_updated_data(restored)
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} refresh {entry.entry_id}"
+        )
+    else:
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            async_release_account(hass, entry)
+            raise
+
+    # 之后的轮询由账户级协调器统一调度
+    account.async_register(coordinator)
+
+    # 可选的本地 MQTT 推送；成本资源没有对应的电表数据
+    topic_prefix = entry.options.get(CONF_MQTT_TOPIC)
+    if topic_prefix and not coordinator.is_cost_resource:
+        push = MqttPushSource(
+            hass,
+            coordinator,
+            meter_topic(topic_prefix, coordinator.resource_type, coordinator.resource_name),
+        )
+        if await push.async_start():
+            coordinator.push = push
+            entry.async_on_unload(push.async_stop)
+
+    # 可选的实时功率通道：独立的短周期轮询，不影响半小时读数的调度
+    # 燃气用量也可能以 kWh 上报，但 current 端点只服务电表
+    power_interval = entry.options.get(CONF_POWER_INTERVAL, DEFAULT_POWER_INTERVAL)
+    if (
+        power_interval
+        and coordinator.resource_type == "kWh"
+        and not coordinator.is_cost_resource
+        and not is_gas_resource(coordinator.resource_type, coordinator.resource_name)
+    ):
+        power = GlowmarktPowerCoordinator(
+            hass,
+            coordinator.client,
+            coordinator.resource_id,
+            timedelta(seconds=max(power_interval, MIN_POWER_INTERVAL)),
+        )
+        coordinator.power = power
+        entry.async_on_unload(power.async_shutdown)
+        entry.async_create_background_task(hass, power.async_refresh(), f"{DOMAIN} power {entry.entry_id}")
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    async_setup_services(hass)
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Reload a config entry after its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Unload a config entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        async_release_account(hass, entry)
+    return unload_ok
+
+
 class GlowmarktDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching Glowmarkt data."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, account: GlowmarktAccount):
         """Initialize coordinator."""
         super().__init__(
             hass,
             _LOGGER,
             name="Glowmarkt",
-            update_interval=DEFAULT_SCAN_INTERVAL,
+            update_interval=None,  # 由 GlowmarktAccountCoordinator 统一触发
+            always_update=False,  # 快照没有变化时不通知传感器
         )
         self.entry = entry
-        self.token = None
+        self.account = account
+        self.client = account.client  # 同一账户的所有条目共享 token 和会话
         self.resource_id = entry.data.get("resource_id")
         self.resource_type = entry.data.get("resource_type", "kWh")
         self.resource_name = entry.data.get("resource_name", "")  # 添加资源名称
         self.is_cost_resource = "cost" in self.resource_name.lower()
 
-    def _authenticate(self):
-        """Authenticate with the Glowmarkt API and retrieve a token."""
-        username = self.entry.data[CONF_USERNAME]
-        password = self.entry.data[CONF_PASSWORD]
-
-        headers = {
-            "applicationId": BRIGHT_APP_ID,
-            "Content-Type": "application/json"
-        }
-        payload = {"username": username, "password": password}
-        response = requests.post(AUTH_URL, json=payload, headers=headers)
-        response.raise_for_status()
+        # 当天读数缓冲（按半小时槽位），每次只增量拉取最近的窗口
+        self._day_start = None
+        self._day = None
+        self._repair_lock = asyncio.Lock()
+        self._units = self.resource_type
+        self._reading_store = ReadingStore(hass, self.resource_id)
+        self.backfill_task = None
+        self.next_poll = None
+        self.metrics = UpdateMetrics()
+        self.push = None
+        self._push_polling = False  # 上次轮询因推送而只安排了对账
+        self.power = None
+        # 成本资源没有用量，不做周/月/年汇总
+        self.rollup = None if self.is_cost_resource else RollupCache(hass, self.client, self.resource_id)
+        # 已结束的小时写入外部统计，迟到的桶只更新变化的小时
+        self.statistics = None if self.is_cost_resource else StatisticsWriter(hass, self)
+        # 推送模式下当前半小时桶的起始读数和最新读数
+        self._push_bucket_ts = None
+        self._push_base = None
+        self._push_last = None
+        self.scheduler = AdaptivePollScheduler()
+        # 电价变化时才重新编译半小时时段表
+        self._tariff = None
+        self._schedule = None
+        self._priced_day = None
+        self.tariff_cache = TariffCache(
+            hass,
+            self.client,
+            self.resource_id,
+            timedelta(minutes=entry.options.get(CONF_TARIFF_TTL, DEFAULT_TARIFF_TTL)),
+        )
+        # 上次成功的快照最多提供这么久，之后实体变为不可用
+        self.max_staleness = timedelta(minutes=entry.options.get(CONF_MAX_STALENESS, DEFAULT_MAX_STALENESS))
 
-        self.token = response.json()["token"]
+    async def _authenticate(self):
+        """Authenticate with the Glowmarkt API and retrieve a token."""
+        await self.client.authenticate()
 
-    def _get_catchup_data(self):
+    async def _get_catchup_data(self):
         """Call the catchup endpoint to fetch historical data that may have been uploaded late."""
-        if not self.token:
-            self._authenticate()
-
-        headers = {
-            "applicationId": BRIGHT_APP_ID,
-            "Authorization": f"Bearer {self.token}"
-        }
-        url = f"{API_URL}/resource/{self.resource_id}/catchup"
         try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 401:
-                _LOGGER.warning("Catchup token expired, re-authenticating")
-                self._authenticate()
-                headers["Authorization"] = f"Bearer {self.token}"
-                response = requests.get(url, headers=headers)
-
-            response.raise_for_status()
-            data = response.json()
+            data = await self.client.get_catchup(self.resource_id)
             _LOGGER.info(f"Catchup data retrieved: {len(data.get('data', []))} entries")
             return data.get("data", [])
         except Exception as err:
             _LOGGER.error(f"Failed to fetch catchup data: {err}")
             return []
 
-    def _merge_readings(self, original, catchup):
-        """Merge catchup readings into original readings, overriding zeros."""
-        merged = {}
-
-        for item in original:
-            if isinstance(item, list) and len(item) >= 2:
-                ts, value = item[0], item[1]
-                merged[ts] = value
-
-        for item in catchup:
-            if isinstance(item, list) and len(item) >= 2:
-                ts, value = item[0], item[1]
-                if ts not in merged or merged[ts] == 0:
-                    merged[ts] = value
-
-        # 返回按时间戳排序的合并结果（二维数组形式）
-        return sorted([[ts, merged[ts]] for ts in merged])
-
-    def _get_usage_data(self):
-        """Fetch usage data from the Glowmarkt API."""
-        if not self.token:
-            self._authenticate()
-
-        headers = {
-            "applicationId": BRIGHT_APP_ID,
-            "Authorization": f"Bearer {self.token}"
-        }
+    def _incremental_start(self):
+        """Return where the next readings window should begin.
+
+        The window starts at the last settled (non-zero) bucket in the day
+        buffer, minus a re-check margin so late corrections are picked up.
+        """
+        last_settled_ts = self._day.last_settled_ts()
+        if last_settled_ts is None:
+            return self._day_start
+
+        last_settled = datetime.fromtimestamp(last_settled_ts, tz=timezone.utc)
+        return max(self._day_start, last_settled - READINGS_RECHECK_MARGIN)
+
+    async def _repair_gaps(self, now, offset_minutes):
+        """Run one backed-off catch-up round targeting only the missing slots."""
+        now_ts = now.timestamp()
+        if self._repair_lock.locked() or not self._day.repair_due(now_ts):
+            return
+
+        async with self._repair_lock:
+            day = self._day
+            _LOGGER.info(f"Repairing {len(day.missing_timestamps())} missing half-hour slots")
+            self.metrics.catchup_runs += 1
+            filled = 0
+            for ts, value in _iter_pairs(await self._get_catchup_data()):
+                filled += day.fill_missing(ts, value)
+
+            remaining = day.missing_timestamps()
+            if remaining:
+                # 只重新拉取缺口覆盖的时间段
+                from_str = datetime.fromtimestamp(remaining[0], tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+                to_str = datetime.fromtimestamp(
+                    remaining[-1] + BUCKET_SECONDS, tz=timezone.utc
+                ).strftime("%Y-%m-%dT%H:%M:%S")
+                try:
+                    api_data = await self.client.get_readings(
+                        self.resource_id, from_str, to_str, offset=offset_minutes
+                    )
+                    for ts, value in _iter_pairs(api_data.get("data", [])):
+                        filled += day.fill_missing(ts, value)
+                except Exception as err:
+                    _LOGGER.warning(f"Failed to re-read missing slots: {err}")
+
+            day.record_repair(now_ts, filled)
+            self.metrics.slots_repaired += filled
+
+    @staticmethod
+    def _day_start_for(now):
+        """Return the start of the readings day that ``now`` belongs to."""
+        # 今天0点35分（UTC）
+        boundary = now.replace(hour=0, minute=35, second=0, microsecond=0)
+
+        if now < boundary:
+            # 如果当前时间小于今天00:35，start就是前一天的00:29
+            return (now - timedelta(days=1)).replace(hour=0, minute=29, second=0, microsecond=0)
+        # 否则start是今天0点0分0秒
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async def async_restore(self):
+        """Load today's buffer and tariff from local storage.
+
+        Returns coordinator data built from the snapshot, or None when there is
+        nothing usable for the current day.
+        """
+        if self.rollup is not None:
+            await self.rollup.async_load()
+
+        stored = await self._reading_store.async_load()
+        if not stored:
+            return None
+
+        start = self._day_start_for(datetime.now(timezone.utc))
+        if stored.get("day_start") != start.isoformat():
+            return None
+
+        self._day_start = start
+        self._day = DayReadings.restore(start.timestamp(), stored.get("values", []))
+        self._units = stored.get("units", self.resource_type)
+        if stored.get("upload_latency") is not None:
+            self.scheduler.upload_latency = stored["upload_latency"]
+
+        readings = self._day.series()
+        if not readings:
+            return None
+
+        tariff = None
+        if self.resource_type == "kWh":
+            tariff_data = await self.tariff_cache.async_cached()
+            tariff = tariff_data.get("data", [{}])[0] if tariff_data else None
+        _LOGGER.debug("Restored %s cached readings for %s", len(readings), self.resource_id)
+        # 数据年龄从上次保存时算起，重启不会让旧数据显得新鲜
+        return self._build_snapshot(readings, tariff, fetched_at=stored.get("fetched_at"))
+
+    async def _get_usage_data(self):
+        """Fetch usage data from the Glowmarkt API and return today's series."""
         # 动态计算BST偏移
         london_tz = ZoneInfo("Europe/London")
         now_localized = datetime.now(london_tz)
@@ -132,81 +304,267 @@ class GlowmarktDataUpdateCoordinator(DataUpdateCoordinator):
         # 计算时间范围
         now = datetime.now(timezone.utc)
         end = now
+        pushing = self._push_active(now)
 
-        # 今天0点35分（UTC）
-        boundary = now.replace(hour=0, minute=35, second=0, microsecond=0)
-
-        if now < boundary:
-            # 如果当前时间小于今天00:35，start就是前一天的00:29
-            start = (now - timedelta(days=1)).replace(hour=0, minute=29, second=0, microsecond=0)
+        if self._ensure_day(now) or pushing:
+            # 跨天、首次运行或推送对账：拉取整天数据
+            window_start = self._day_start
         else:
-            # 否则start是今天0点0分0秒
-            start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
+            window_start = self._incremental_start()
 
-        from_str = start.strftime("%Y-%m-%dT%H:%M:%S")
+        from_str = window_start.strftime("%Y-%m-%dT%H:%M:%S")
         to_str = end.strftime("%Y-%m-%dT%H:%M:%S")
 
-        url = f"{API_URL}/resource/{self.resource_id}/readings?from={from_str}&to={to_str}&period=PT30M&offset={offset_minutes}&function=sum"
-
-        response = requests.get(url, headers=headers)
-        if response.status_code == 401:
-            _LOGGER.warning("Token expired, re-authenticating")
-            self._authenticate()
-            headers["Authorization"] = f"Bearer {self.token}"
-            response = requests.get(url, headers=headers)
+        api_data = await self.client.get_readings(
+            self.resource_id, from_str, to_str, offset=offset_minutes
+        )
 
-        response.raise_for_status()
-        api_data = response.json()
+        # 新拉取的窗口覆盖缓冲中的旧值；推送模式下云端尚未上传的 0 不覆盖本地推送值
+        for ts, value in _iter_pairs(api_data.get("data", [])):
+            if value or not pushing:
+                self._day.update(ts, value)
+        self._units = api_data.get("units", self._units)
 
-        readings = api_data.get("data", [])
-        units = api_data.get("units", self.resource_type)
+        # 只对超过宽限期仍为 0 的槽位按退避计划补数
+        self._day.refresh_gaps(now.timestamp())
+        await self._repair_gaps(now, offset_minutes)
 
-        # 若 readings 中有 0，则调用 catchup 接口并合并
-        if any(isinstance(r, list) and len(r) > 1 and r[1] == 0 for r in readings):
-            _LOGGER.info("Detected zero in readings. Fetching catchup data...")
-            catchup_data = self._get_catchup_data()
-            readings = self._merge_readings(readings, catchup_data)
+        readings = self._day.series()
 
-        if not readings or not isinstance(readings[0], list) or len(readings[0]) < 2:
+        if not readings:
             raise UpdateFailed("API response has no usable readings")
 
-        return {
-            "readings": readings,
-            "timestamp": readings[-1][0] if readings else None,
-            "units": units,
-            "cumulative": sum(r[1] for r in readings if isinstance(r, list) and len(r) > 1),
-            "resource_type": self.resource_type,
-        }
+        return readings
 
 
 
             
-    def _get_tariff_data(self):
-        """Get tariff information from API."""
-        headers = {
-            "applicationId": BRIGHT_APP_ID,
-            "Authorization": f"Bearer {self.token}"
-        }
-        url = f"{API_URL}/resource/{self.resource_id}/tariff"
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+    def _calendar_day_ts(self):
+        """Return the UTC midnight of the calendar day the day buffer belongs to."""
+        return self._day_start.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+    def _ensure_day(self, now):
+        """Start a fresh day buffer when ``now`` is in a new day; return True if it did."""
+        start = self._day_start_for(now)
+        if start == self._day_start:
+            return False
+        # 00:35 之前的回看窗口仍属于前一天，日历日前进时才结算
+        if self._day is not None and self.rollup is not None and start.date() > self._day_start.date():
+            # 旧的一天结束，只把属于这一天的槽位计入汇总缓存
+            day_start_ts = self._calendar_day_ts()
+            self.rollup.record_day(
+                self._day_start.date(),
+                self._day.series().sum_between(day_start_ts, day_start_ts + SLOTS_PER_DAY * BUCKET_SECONDS),
+            )
+        if self._day is not None and self.statistics is not None and start.date() > self._day_start.date():
+            day_start_ts = self._calendar_day_ts()
+            self.statistics.async_close_day(day_start_ts, self._day, day_start_ts + SLOTS_PER_DAY * BUCKET_SECONDS)
+        self._day_start = start
+        self._day = DayReadings(start.timestamp())
+        return True
+
+    def _push_active(self, now):
+        """Return True while the local MQTT push is delivering readings."""
+        return self.push is not None and self.push.active(now)
+
+    def poll_due_at(self):
+        """Return when the account cycle should next poll the cloud, or None when due now.
+
+        While readings are pushed only the hourly reconciliation is scheduled,
+        but the resource falls due as soon as the push would go stale, so
+        normal polling resumes without waiting for the reconciliation.
+        """
+        if self.next_poll is None or not self._push_polling:
+            return self.next_poll
+        return min(self.next_poll, self.push.last_message + PUSH_STALE_AFTER)
+
+    def _schedule_save(self):
+        """Persist today's buffer after a short delay."""
+        self._reading_store.async_schedule_save(
+            {
+                "day_start": self._day_start.isoformat(),
+                "values": list(self._day.values),
+                "units": self._units,
+                "upload_latency": self.scheduler.upload_latency,
+                "fetched_at": dt_util.utcnow().isoformat(),
+            }
+        )
+
+    @callback
+    def async_handle_push(self, reading):
+        """Fold a pushed meter register reading into the current bucket.
+
+        A bucket's usage is the register delta since the bucket started. The
+        bucket the push began in is left to the cloud, since its starting
+        register is unknown; the hourly cloud reconciliation overwrites
+        every settled bucket anyway.
+        """
+        if self._day is None:
+            # 还没有云端数据，等首次刷新建立当天缓冲
+            return
+
+        # 跨天时上一个桶落在旧的一天，update 会忽略它，但起点读数照常延续
+        self._ensure_day(datetime.fromtimestamp(reading.timestamp, tz=timezone.utc))
+        bucket_ts = reading.timestamp - reading.timestamp % BUCKET_SECONDS
+
+        if bucket_ts != self._push_bucket_ts:
+            if self._push_base is not None and self._push_bucket_ts is not None:
+                # 上一个桶结束：用最后一次读数定稿
+                self._day.update(self._push_bucket_ts, round(self._push_last - self._push_base, 3))
+            # 第一次收到推送时不知道桶的起点读数
+            self._push_base = self._push_last if self._push_bucket_ts is not None else None
+            self._push_bucket_ts = bucket_ts
+        self._push_last = reading.cumulative
+
+        if self._push_base is not None:
+            self._day.update(bucket_ts, round(max(reading.cumulative - self._push_base, 0), 3))
+
+        readings = self._day.series()
+        if not readings:
+            return
+        self._schedule_save()
+        tariff = self.data.tariff if self.data is not None else None
+        self.async_set_updated_data(self._build_snapshot(readings, tariff))
+
+    def _price_day(self, tariff):
+        """Return the tariff's rate schedule, pricing the day buffer with it.
+
+        The schedule is compiled only when the tariff changes and the buffer
+        is re-priced only when the tariff or the day changes; in between the
+        buffer keeps its usage cost up to date as buckets arrive.
+        """
+        if tariff is None:
+            return None
+        if tariff is not self._tariff:
+            self._tariff = tariff
+            self._schedule = compile_schedule(tariff)
+            self._priced_day = None
+        if self._priced_day is not self._day:
+            # 缓冲最多跨 24.5 小时，多留两个槽位
+            self._day.set_rates(self._schedule.rates_for(self._day.base_ts, SLOTS_PER_DAY + 2))
+            self._priced_day = self._day
+        return self._schedule
+
+    def _build_snapshot(self, readings, tariff, fetched_at=None):
+        """Build the sensors' snapshot, adding the week, month and year totals."""
+        rollup = None
+        if self.rollup is not None:
+            rollup = self.rollup.totals(self._day_start.date())
+        schedule = self._price_day(tariff)
+        return build_snapshot(
+            readings,
+            self._units,
+            self.resource_type,
+            tariff,
+            fetched_at=fetched_at,
+            rollup=rollup,
+            schedule=schedule,
+            usage_cost=self._day.usage_cost if schedule is not None else None,
+        )
+
+    async def _get_tariff_data(self):
+        """Get tariff information, from the cache when it is still fresh."""
+        return await self.tariff_cache.async_get()
+
+    def data_age(self, now):
+        """Return how old the current snapshot's data is, or None."""
+        if self.data is None or self.data.fetched_at is None:
+            return None
+        return now - dt_util.parse_datetime(self.data.fetched_at)
+
+    def _serve_stale(self, err=None):
+        """Return the last good snapshot marked as stale.
+
+        Used while the API is paused and after a failed poll, so entities
+        keep their state instead of turning unavailable. Once the snapshot
+        is older than ``max_staleness`` the failure is raised instead.
+        """
+        now = datetime.now(timezone.utc)
+        if self.client.breaker.is_open:
+            self.next_poll = datetime.fromtimestamp(self.client.breaker.open_until, tz=timezone.utc)
+        if self._push_active(now):
+            # 本地推送仍在更新数据，不算过期
+            return self.data
+        reason = err or "API paused"
+        age = self.data_age(now)
+        if age is not None and age > self.max_staleness:
+            raise UpdateFailed(f"No fresh data for {age}: {reason}")
+        _LOGGER.debug("Serving cached data for %s: %s", self.resource_id, reason)
+        if self.data.stale:
+            return self.data
+        return dataclasses.replace(self.data, stale=True)
 
     async def _async_update_data(self):
+        """Fetch the latest data, recording how long the update took."""
+        started = time.monotonic()
+        try:
+            return await self._async_update()
+        except UpdateFailed:
+            self.metrics.failures += 1
+            raise
+        finally:
+            self.metrics.record_update(time.monotonic() - started)
+
+    async def _async_update(self):
         """Fetch and return the latest data."""
+        if self.client.breaker.is_open and self.data is not None:
+            # 断路器打开：不发请求，继续提供上次的数据
+            return self._serve_stale()
+        auth_error = self.account.coordinator.auth_error
+        if auth_error is not None:
+            # 账户登录失败：不再重复登录，按过期数据处理
+            self.next_poll = datetime.now(timezone.utc) + FAST_POLL_INTERVAL
+            if self.data is None:
+                raise UpdateFailed(f"Authentication failed: {auth_error}")
+            snapshot = self._serve_stale(f"Authentication failed: {auth_error}")
+            self.metrics.failures += 1
+            return snapshot
+
         try:
-            data = await self.hass.async_add_executor_job(self._get_usage_data)
+            readings = await self._get_usage_data()
             
             # 只有电力资源获取电价信息
+            tariff = None
             if self.resource_type == "kWh":
                 try:
-                    tariff_data = await self.hass.async_add_executor_job(self._get_tariff_data)
-                    data["tariff"] = tariff_data.get("data", [{}])[0]  # 取第一个tariff数据
+                    tariff_data = await self._get_tariff_data()
+                    tariff = tariff_data.get("data", [{}])[0]  # 取第一个tariff数据
                 except Exception as e:
                     _LOGGER.warning(f"Failed to get tariff info: {e}")
-                    data["tariff"] = None
+                    # 继续使用上次的电价，成本传感器不会因此不可用
+                    tariff = self._tariff
+
+            # 周/月/年汇总每天对账一次，其余轮询不产生额外请求
+            if self.rollup is not None:
+                await self.rollup.async_reconcile(datetime.now(timezone.utc), self._day_start.date())
+
+            if self.statistics is not None:
+                try:
+                    await self.statistics.async_update(self._calendar_day_ts(), self._day)
+                except Exception as e:
+                    _LOGGER.warning(f"Failed to write usage statistics: {e}")
+
+            now = datetime.now(timezone.utc)
+            if self._push_active(now):
+                # 推送提供实时数据，云端只需定期对账和刷新电价
+                self.next_poll = now + PUSH_RECONCILE_INTERVAL
+                self._push_polling = True
+            else:
+                self._push_polling = False
+                # 根据最新桶是否到达调整下一次轮询时间
+                self.scheduler.observe(now, self._day.last_settled_ts())
+                self.next_poll = now + self.scheduler.next_interval(now)
+
+            self._schedule_save()
             
-            return data
+            # 所有派生值在这里一次算好，传感器只做属性读取
+            return self._build_snapshot(readings, tariff)
         except Exception as err:
-            raise UpdateFailed(f"Update failed: {err}")
+            if self.client.breaker.is_open and self.data is not None:
+                return self._serve_stale(err)
+            self.next_poll = datetime.now(timezone.utc) + FAST_POLL_INTERVAL
+            if self.data is None:
+                raise UpdateFailed(f"Update failed: {err}")
+            snapshot = self._serve_stale(f"Update failed: {err}")
+            self.metrics.failures += 1
+            return snapshot
@@ -0,0 +1,337 @@
+"""Async client for the Glowmarkt API."""
+import asyncio
+import contextlib
+import logging
+import time
+
+import aiohttp
+
+from .const import (
+    API_URL,
+    AUTH_URL,
+    BRIGHT_APP_ID,
+    REQUEST_TIMEOUT,
+    REQUEST_RATE,
+    REQUEST_BURST,
+    REQUEST_MAX_RETRIES,
+    REQUEST_BACKOFF_BASE,
+    REQUEST_MAX_RETRY_DELAY,
+    RETRY_STATUSES,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    BREAKER_MAX_TIMEOUT,
+    TOKEN_DEFAULT_LIFETIME,
+)
+from .metrics import ApiMetrics
+from .ratelimit import CircuitBreaker, TokenBucket, backoff_delay, parse_retry_after
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GlowmarktApiError(Exception):
+    """Raised when a Glowmarkt API request fails."""
+
+
+class GlowmarktAuthError(GlowmarktApiError):
+    """Raised when the Glowmarkt credentials are rejected."""
+
+
+class GlowmarktRateLimitError(GlowmarktApiError):
+    """Raised when the API keeps answering 429/503 or failing transiently."""
+
+    def __init__(self, message, retry_after=None):
+        """Initialize the error with the server's requested delay, if any."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GlowmarktCircuitOpenError(GlowmarktApiError):
+    """Raised without sending a request while the circuit breaker is open."""
+
+
+def _endpoint(url):
+    """Return the metrics name of a request URL, e.g. ``readings``."""
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def parse_resources(resources):
+    """Map raw ``/resource`` entries to ``{resource_id: metadata}``."""
+    return {
+        r["resourceId"]: {
+            "name": r["name"],
+            "baseUnit": r.get("baseUnit", ""),
+            "resourceTypeId": r.get("resourceTypeId", ""),
+        }
+        for r in resources
+    }
+
+
+class GlowmarktApiClient:
+    """Small async wrapper around the Glowmarkt REST API.
+
+    All requests go through the aiohttp session handed in by the caller, so
+    connections are pooled and kept alive between polls. One client is shared
+    by every config entry of an account, so re-authentication is single-flight
+    and the token bucket and circuit breaker apply to the whole account.
+    Transient failures (timeouts, 429, 5xx) are retried with jittered
+    exponential backoff, honouring ``Retry-After``.
+
+    The token's expiry is kept alongside it; requests only wait for a login
+    when there is no token or it has already expired, while the account hub
+    renews it in the background ahead of time. Every HTTP attempt is
+    recorded in ``metrics`` for diagnostics.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        username,
+        password,
+        token=None,
+        token_expires=None,
+        token_listener=None,
+        request_slot=None,
+    ):
+        """Initialize the client.
+
+        ``request_slot`` returns an async context manager held around every
+        HTTP request, used to cap requests in flight across accounts.
+        """
+        self._session = session
+        self._username = username
+        self._password = password
+        self._timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        self.token = token
+        self.token_expires = token_expires  # Unix 时间戳，未知时为 None
+        self._token_listener = token_listener
+        self._request_slot = request_slot or contextlib.nullcontext
+        self._auth_lock = asyncio.Lock()
+        self._bucket = TokenBucket(REQUEST_RATE, REQUEST_BURST)
+        self.breaker = CircuitBreaker(
+            BREAKER_FAILURE_THRESHOLD,
+            BREAKER_RESET_TIMEOUT.total_seconds(),
+            BREAKER_MAX_TIMEOUT.total_seconds(),
+        )
+        self.metrics = ApiMetrics()
+
+    async def authenticate(self):
+        """Authenticate with the Glowmarkt API and store the token."""
+        async with self._auth_lock:
+            return await self._login()
+
+    @property
+    def token_expired(self):
+        """Return True when there is no usable token."""
+        if not self.token:
+            return True
+        return self.token_expires is not None and time.time() >= self.token_expires
+
+    async def async_ensure_token(self):
+        """Log in first if the token is missing or already expired."""
+        if self.token_expired:
+            await self._refresh_token(self.token)
+        return self.token
+
+    async def async_refresh_token(self):
+        """Renew a token that is still valid but close to expiry."""
+        return await self._refresh_token(self.token)
+
+    async def _refresh_token(self, failed_token):
+        """Replace a rejected token, logging in at most once for concurrent callers."""
+        async with self._auth_lock:
+            if self.token is not None and self.token != failed_token and not self.token_expired:
+                # 其他协程已经刷新过 token
+                return self.token
+            return await self._login()
+
+    async def _login(self):
+        """Post credentials to the auth endpoint."""
+        headers = {
+            "applicationId": BRIGHT_APP_ID,
+            "Content-Type": "application/json",
+        }
+        payload = {"username": self._username, "password": self._password}
+        if self.breaker.is_open:
+            raise GlowmarktCircuitOpenError("Glowmarkt API paused after repeated failures")
+        await self._bucket.acquire()
+        started = time.monotonic()
+        try:
+            async with self._request_slot():
+                started = time.monotonic()
+                async with self._session.post(
+                    AUTH_URL, json=payload, headers=headers, timeout=self._timeout
+                ) as response:
+                    raw = await response.read()
+                    self.metrics.record("auth", response.status, time.monotonic() - started, len(raw))
+                    if response.status in (401, 403):
+                        raise GlowmarktAuthError("Invalid username or password")
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+        except (aiohttp.ClientError, TimeoutError) as err:
+            if not isinstance(err, aiohttp.ClientResponseError):
+                self.metrics.record("auth", None, time.monotonic() - started)
+            # 认证端点的网络故障和 5xx 同样计入断路器，错误的密码不计
+            self.breaker.record_failure()
+            raise GlowmarktApiError(f"Authentication request failed: {err}") from err
+
+        if not data.get("valid", True) or "token" not in data:
+            raise GlowmarktAuthError("Authentication response contained no token")
+
+        self.breaker.record_success()
+        self.token = data["token"]
+        try:
+            self.token_expires = float(data["exp"])
+        except (KeyError, TypeError, ValueError):
+            self.token_expires = time.time() + TOKEN_DEFAULT_LIFETIME.total_seconds()
+        if self._token_listener is not None:
+            self._token_listener()
+        return self.token
+
+    async def get_resources(self):
+        """Return the raw list of resources on the account."""
+        return await self._get(f"{API_URL}/resource", token_header=True)
+
+    async def get_readings(self, resource_id, from_str, to_str, period="PT30M", offset=0, function="sum"):
+        """Return readings for a resource between two API timestamps."""
+        params = {
+            "from": from_str,
+            "to": to_str,
+            "period": period,
+            "offset": offset,
+            "function": function,
+        }
+        return await self._get(f"{API_URL}/resource/{resource_id}/readings", params=params)
+
+    async def get_catchup(self, resource_id):
+        """Ask the API to pull late data for a resource and return it."""
+        return await self._get(f"{API_URL}/resource/{resource_id}/catchup")
+
+    async def get_current(self, resource_id):
+        """Return the resource's latest instantaneous reading."""
+        return await self._get(f"{API_URL}/resource/{resource_id}/current")
+
+    async def get_tariff(self, resource_id):
+        """Return tariff information for a resource."""
+        return await self._get(f"{API_URL}/resource/{resource_id}/tariff")
+
+    async def get_tariff_conditional(self, resource_id, etag=None, last_modified=None):
+        """Return ``(body, etag, last_modified)`` for a resource's tariff.
+
+        The validators from a previous response are sent back to the API, and
+        ``body`` is ``None`` when it answers 304 Not Modified.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        body, response_headers = await self._get(
+            f"{API_URL}/resource/{resource_id}/tariff",
+            extra_headers=headers,
+            conditional=True,
+        )
+        return (
+            body,
+            response_headers.get("ETag", etag),
+            response_headers.get("Last-Modified", last_modified),
+        )
+
+    def _headers(self, token_header=False, extra_headers=None):
+        """Build request headers for the current token."""
+        headers = {"applicationId": BRIGHT_APP_ID}
+        # /resource 使用 token 头，其余接口使用 Bearer
+        if token_header:
+            headers["token"] = self.token
+        else:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if extra_headers:
+            headers.update(extra_headers)
+        return headers
+
+    @staticmethod
+    async def _read(response, conditional):
+        """Decode a response body, passing headers through for conditional requests."""
+        if conditional and response.status == 304:
+            return None, response.headers
+        response.raise_for_status()
+        body = await response.json(content_type=None)
+        return (body, response.headers) if conditional else body
+
+    async def _send(self, url, params, token_header, extra_headers, conditional):
+        """Send a GET with pacing and transient-error retries.
+
+        Returns ``(status, result)``; a 401 is handed back to the caller so it
+        can re-authenticate.
+        """
+        endpoint = _endpoint(url)
+        error = None
+        for attempt in range(REQUEST_MAX_RETRIES + 1):
+            await self._bucket.acquire()
+            retry_after = None
+            started = time.monotonic()
+            try:
+                async with self._request_slot():
+                    # 等待全局并发名额的时间不计入请求耗时
+                    started = time.monotonic()
+                    async with self._session.get(
+                        url,
+                        params=params,
+                        headers=self._headers(token_header, extra_headers),
+                        timeout=self._timeout,
+                    ) as response:
+                        raw = await response.read()
+                        self.metrics.record(endpoint, response.status, time.monotonic() - started, len(raw))
+                        if response.status == 401:
+                            return 401, None
+                        if response.status in RETRY_STATUSES:
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                            error = GlowmarktRateLimitError(
+                                f"Request to {url} failed with status {response.status}", retry_after
+                            )
+                        else:
+                            return response.status, await self._read(response, conditional)
+            except aiohttp.ClientResponseError as err:
+                # 其他 4xx 不是服务端故障，不重试
+                raise GlowmarktApiError(f"Request to {url} failed: {err}") from err
+            except (aiohttp.ClientError, TimeoutError) as err:
+                self.metrics.record(endpoint, None, time.monotonic() - started)
+                error = GlowmarktRateLimitError(f"Request to {url} failed: {err}")
+
+            if attempt == REQUEST_MAX_RETRIES:
+                break
+            delay = (
+                retry_after
+                if retry_after is not None
+                else backoff_delay(attempt, REQUEST_BACKOFF_BASE, REQUEST_MAX_RETRY_DELAY)
+            )
+            if delay > REQUEST_MAX_RETRY_DELAY:
+                # 服务端要求等待太久：交给断路器暂停轮询
+                break
+            _LOGGER.debug("Retrying %s in %.1fs", url, delay)
+            self.metrics.retries += 1
+            await asyncio.sleep(delay)
+
+        raise error
+
+    async def _get(self, url, params=None, token_header=False, extra_headers=None, conditional=False):
+        """Perform a GET, re-authenticating once on 401."""
+        if self.breaker.is_open:
+            raise GlowmarktCircuitOpenError("Glowmarkt API paused after repeated failures")
+        await self.async_ensure_token()
+
+        token = self.token
+        try:
+            status, result = await self._send(url, params, token_header, extra_headers, conditional)
+            if status == 401:
+                _LOGGER.warning("Token expired, re-authenticating")
+                await self._refresh_token(token)
+                status, result = await self._send(url, params, token_header, extra_headers, conditional)
+                if status == 401:
+                    raise GlowmarktAuthError(f"Request to {url} was not authorized")
+        except GlowmarktRateLimitError as err:
+            self.breaker.record_failure(err.retry_after)
+            raise
+
+        self.breaker.record_success()
+        return result
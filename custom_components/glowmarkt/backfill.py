@@ -0,0 +1,239 @@
+"""Backfill historical half-hour readings into long-term statistics."""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+    statistics_during_period,
+)
+from homeassistant.const import UnitOfEnergy, UnitOfVolume
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    BUCKET_SECONDS,
+    BACKFILL_STORAGE_VERSION,
+    BACKFILL_WINDOW,
+    BACKFILL_CONCURRENCY,
+    BACKFILL_BATCH_DELAY,
+    BACKFILL_SEED_WINDOW,
+    BACKFILL_SEED_LOOKBACK,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_UNITS = {
+    "kWh": UnitOfEnergy.KILO_WATT_HOUR,
+    "m³": UnitOfVolume.CUBIC_METERS,
+}
+
+
+def statistic_id_for(resource_id):
+    """Return the external statistic id used for a resource's usage."""
+    return f"{DOMAIN}:{resource_id.lower().replace('-', '_')}_usage"
+
+
+def statistic_metadata(coordinator):
+    """Return the external statistic metadata of a resource's usage."""
+    return StatisticMetaData(
+        has_mean=False,
+        has_sum=True,
+        name=f"Glowmarkt {coordinator.resource_name or coordinator.resource_id} usage",
+        source=DOMAIN,
+        statistic_id=statistic_id_for(coordinator.resource_id),
+        unit_of_measurement=_UNITS.get(coordinator.resource_type),
+    )
+
+
+def _rows_between(hass, statistic_id, start_time, end_time):
+    """Return the statistic's hourly rows from ``start_time`` up to ``end_time`` in time order."""
+    result = statistics_during_period(
+        hass, start_time, end_time, {statistic_id}, "hour", None, {"state", "sum"}
+    )
+    return result.get(statistic_id, [])
+
+
+def _row_near(hass, statistic_id, boundary, after):
+    """Return the statistic's last hourly row before ``boundary``, or its first from it.
+
+    Only a window next to the boundary is read, widened while it is empty,
+    so finding one row does not load months of history.
+    """
+    result = get_last_statistics(hass, 1, statistic_id, False, {"state", "sum"})
+    newest = result.get(statistic_id)
+    if not newest:
+        return None
+    if newest[0]["start"] < boundary.timestamp():
+        # 最新一行在边界之前：向前查找就是它，向后没有行
+        return None if after else newest[0]
+    newest_start = datetime.fromtimestamp(newest[0]["start"], tz=timezone.utc)
+    window = BACKFILL_SEED_WINDOW
+    while True:
+        if after:
+            rows = _rows_between(hass, statistic_id, boundary, boundary + window)
+            if rows:
+                return rows[0]
+            if boundary + window > newest_start:
+                return newest[0]
+        else:
+            rows = _rows_between(hass, statistic_id, boundary - window, boundary)
+            if rows:
+                return rows[-1]
+            if window >= BACKFILL_SEED_LOOKBACK:
+                return None
+        window *= 4
+
+
+def _hourly_statistics(readings, window_start_ts, window_end_ts, running_sum):
+    """Fold half-hour buckets into hourly statistics with a running sum."""
+    hours = {}
+    for item in readings:
+        if not isinstance(item, list) or len(item) < 2:
+            continue
+        ts, value = item[0], item[1]
+        if not window_start_ts <= ts < window_end_ts:
+            continue
+        hour_ts = ts - ts % (2 * BUCKET_SECONDS)
+        hours[hour_ts] = hours.get(hour_ts, 0) + (value or 0)
+
+    statistics = []
+    for hour_ts in sorted(hours):
+        running_sum += hours[hour_ts]
+        statistics.append(
+            StatisticData(
+                start=datetime.fromtimestamp(hour_ts, tz=timezone.utc),
+                state=hours[hour_ts],
+                sum=running_sum,
+            )
+        )
+    return statistics, running_sum
+
+
+async def async_fetch_window(client, resource_id, window_start, window_end):
+    """Fetch the half-hour readings of ``resource_id`` in one UTC window."""
+    api_data = await client.get_readings(
+        resource_id,
+        window_start.strftime("%Y-%m-%dT%H:%M:%S"),
+        (window_end - timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%S"),
+        offset=0,
+    )
+    return api_data.get("data", [])
+
+
+def split_windows(start, end, window):
+    """Return consecutive ``(start, end)`` windows of at most ``window`` covering the range."""
+    windows = []
+    cursor = start
+    while cursor < end:
+        window_end = min(cursor + window, end)
+        windows.append((cursor, window_end))
+        cursor = window_end
+    return windows
+
+
+class StatisticsBackfill:
+    """Page a resource's readings into recorder external statistics.
+
+    The range is split into windows that are fetched a few at a time and
+    imported in order, one window at a time, so the full series is never held
+    in memory. A checkpoint with the next window and running sum is saved after
+    each window so an interrupted backfill resumes where it stopped.
+
+    The running sum starts from the last statistic before the range. Rows
+    already recorded after the range, such as today's live hours, are
+    re-based once it finishes so the first of them continues from the
+    imported total, keeping the statistic continuous wherever the range ends.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator):
+        """Initialize the backfill."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self._store = Store(
+            hass, BACKFILL_STORAGE_VERSION, f"{DOMAIN}.backfill_{coordinator.resource_id}"
+        )
+        self.statistic_id = statistic_id_for(coordinator.resource_id)
+
+    async def _fetch(self, window_start, window_end):
+        """Fetch one window of half-hour readings in UTC."""
+        return await async_fetch_window(
+            self._coordinator.client, self._coordinator.resource_id, window_start, window_end
+        )
+
+    async def _async_row_near(self, boundary, after):
+        """Read the statistic's row next to ``boundary`` from the recorder."""
+        return await get_instance(self._hass).async_add_executor_job(
+            _row_near, self._hass, self.statistic_id, boundary, after
+        )
+
+    async def async_run(self, start: datetime, end: datetime, resume=True):
+        """Backfill statistics from ``start`` up to ``end``."""
+        # 只导入已经结束的整天，今天的数据由实时轮询负责
+        end = min(end, dt_util.utcnow().replace(hour=0, minute=0, second=0, microsecond=0))
+        cursor = start
+
+        checkpoint = await self._store.async_load() if resume else None
+        if checkpoint and checkpoint.get("start") == start.isoformat():
+            # 续传沿用原来的结束时间，范围结束处的旧累计值只对它有效
+            end = dt_util.parse_datetime(checkpoint["end"])
+            cursor = dt_util.parse_datetime(checkpoint["next"])
+            running_sum = checkpoint["sum"]
+            end_base = checkpoint.get("end_base")
+            _LOGGER.info(f"Resuming backfill of {self.statistic_id} from {cursor}")
+        else:
+            # 接着范围之前的累计值
+            before = await self._async_row_near(start, after=False)
+            running_sum = (before["sum"] or 0.0) if before else 0.0
+            # 范围之后第一行原来接着的累计值，用于结束后重新对齐已有的行
+            after = await self._async_row_near(end, after=True)
+            end_base = ((after["sum"] or 0.0) - (after["state"] or 0.0)) if after else None
+
+        windows = split_windows(cursor, end, BACKFILL_WINDOW)
+
+        metadata = statistic_metadata(self._coordinator)
+        for index in range(0, len(windows), BACKFILL_CONCURRENCY):
+            batch = windows[index:index + BACKFILL_CONCURRENCY]
+            results = await asyncio.gather(*(self._fetch(*window) for window in batch))
+
+            # 并发拉取，但必须按时间顺序写入，累计值才能连续
+            for (window_start, window_end), readings in zip(batch, results):
+                statistics, running_sum = _hourly_statistics(
+                    readings, window_start.timestamp(), window_end.timestamp(), running_sum
+                )
+                if statistics:
+                    async_add_external_statistics(self._hass, metadata, statistics)
+                await self._store.async_save(
+                    {
+                        "start": start.isoformat(),
+                        "end": end.isoformat(),
+                        "next": window_end.isoformat(),
+                        "sum": running_sum,
+                        "end_base": end_base,
+                    }
+                )
+
+            # 限速，避免挤占实时轮询
+            if index + BACKFILL_CONCURRENCY < len(windows):
+                await asyncio.sleep(BACKFILL_BATCH_DELAY)
+
+        instance = get_instance(self._hass)
+        if end_base is not None and running_sum != end_base:
+            # 范围之后已有的行（例如今天实时写入的小时）整体平移，接上导入的累计值
+            instance.async_adjust_statistics(
+                self.statistic_id, end, running_sum - end_base, metadata["unit_of_measurement"]
+            )
+        # 等记录器写完，实时写入重新读取基准时才能看到导入的行
+        await instance.async_block_till_done()
+
+        # 已完成的回填不能再续传，否则会重复平移
+        await self._store.async_remove()
+        _LOGGER.info(f"Backfill of {self.statistic_id} finished: {len(windows)} windows")
+        if self._coordinator.statistics is not None:
+            # 历史累计值可能变了，实时写入下次从记录器重新读取基准
+            self._coordinator.statistics.async_reset()
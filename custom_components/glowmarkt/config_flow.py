@@ -5,18 +5,25 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-import requests
-
+from .api import GlowmarktApiClient, parse_resources
+from .hub import async_seed_account
 from .const import (
     DOMAIN,
-    BRIGHT_APP_ID,
     CONF_USERNAME,
     CONF_PASSWORD,
-    API_URL,
-    AUTH_URL,
     CONF_RESOURCE_ID,
-    CONF_RESOURCE_TYPE
+    CONF_RESOURCES,
+    CONF_RESOURCE_TYPE,
+    CONF_TARIFF_TTL,
+    DEFAULT_TARIFF_TTL,
+    CONF_MQTT_TOPIC,
+    CONF_POWER_INTERVAL,
+    DEFAULT_POWER_INTERVAL,
+    CONF_MAX_STALENESS,
+    DEFAULT_MAX_STALENESS,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -34,6 +41,20 @@ class GlowmarktConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow handler."""
+        return GlowmarktOptionsFlow(config_entry)
+
+    def __init__(self):
+        """Initialize the flow."""
+        # 同一次配置会话中缓存登录和资源发现的结果
+        self._username = None
+        self._password = None
+        self._client = None
+        self._resources = {}
+
     async def async_step_user(self, user_input=None) -> FlowResult:
         """Handle the initial step."""
         errors = {}
@@ -44,70 +65,142 @@ class GlowmarktConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             try:
                 # Authenticate and fetch resources
-                token = await self.hass.async_add_executor_job(
-                    self._authenticate, username, password
-                )
+                client = await self._authenticate(username, password)
 
-                resources = await self.hass.async_add_executor_job(
-                    self._get_resources, token
-                )
+                resources = await self._get_resources(client)
 
                 if not resources:
                     raise ValueError("No resources found")
-
-                # Create entries for each electricity and gas resource
-                for resource_id, resource_data in resources.items():
-                    # 修改：同时识别消费和成本资源
-                    if resource_data['baseUnit'] in ['kWh', 'm³'] or 'cost' in resource_data['name'].lower():
-                        await self.async_set_unique_id(resource_id)
-                        self._abort_if_unique_id_configured()
-
-                        return self.async_create_entry(
-                            title=f"Glowmarkt - {resource_data['name']}",
-                            data={
-                                CONF_USERNAME: username,
-                                CONF_PASSWORD: password,
-                                CONF_RESOURCE_ID: resource_id,
-                                "resource_type": resource_data['baseUnit'] if resource_data['baseUnit'] else "cost",
-                                "resource_name": resource_data['name']  # 添加资源名称用于识别成本资源
-                            },
-                        )
-
-                raise ValueError("No electricity, gas or cost resources found")
-
             except Exception as e:
                 _LOGGER.exception("Authentication failed: %s", e)
                 errors["base"] = "auth_failed"
+            else:
+                self._username = username
+                self._password = password
+                self._client = client
+                self._resources = resources
+                return await self.async_step_resources()
 
         return self.async_show_form(step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors)
 
-    def _authenticate(self, username, password):
-        """Get token."""
-        headers = {
-            "applicationId": BRIGHT_APP_ID,
-            "Content-Type": "application/json",
+    async def async_step_resources(self, user_input=None) -> FlowResult:
+        """Let the user pick every resource to add from the cached discovery."""
+        # 修改：同时识别消费和成本资源
+        supported = [
+            resource_id
+            for resource_id, resource_data in self._resources.items()
+            if resource_data['baseUnit'] in ['kWh', 'm³'] or 'cost' in resource_data['name'].lower()
+        ]
+        if not supported:
+            return self.async_abort(reason="no_resources")
+        configured = self._async_current_ids()
+        available = {
+            resource_id: self._resources[resource_id] for resource_id in supported if resource_id not in configured
         }
-        payload = {"username": username, "password": password}
-        response = requests.post(AUTH_URL, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()["token"]
+        if not available:
+            return self.async_abort(reason="already_configured")
 
-    def _get_resources(self, token):
-        """Fetch available resources."""
-        headers = {
-            "applicationId": BRIGHT_APP_ID,
-            "token": token,
+        errors = {}
+        if user_input is not None:
+            selected = [resource_id for resource_id in user_input[CONF_RESOURCES] if resource_id in available]
+            if selected:
+                return await self._async_create_entries(selected)
+            errors["base"] = "no_resources_selected"
+
+        options = {
+            resource_id: f"{resource_data['name']} ({resource_data['baseUnit'] or 'cost'})"
+            for resource_id, resource_data in available.items()
+        }
+        schema = vol.Schema({vol.Required(CONF_RESOURCES, default=list(options)): cv.multi_select(options)})
+        return self.async_show_form(step_id="resources", data_schema=schema, errors=errors)
+
+    async def async_step_import(self, import_data) -> FlowResult:
+        """Create the entry of one resource selected in another flow."""
+        await self.async_set_unique_id(import_data[CONF_RESOURCE_ID])
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(title=f"Glowmarkt - {import_data['resource_name']}", data=import_data)
+
+    async def _async_create_entries(self, selected):
+        """Create an entry for every selected resource.
+
+        A flow creates a single entry, so the other resources each get an
+        import flow carrying their entry data. The account store is seeded
+        first with the flow's token and resource list, so the new entries
+        neither log in nor rediscover on their first refresh.
+        """
+        await async_seed_account(
+            self.hass, self._username, self._client.token, self._client.token_expires, self._resources
+        )
+        first, *others = selected
+        for resource_id in others:
+            self.hass.async_create_task(
+                self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": config_entries.SOURCE_IMPORT},
+                    data=self._entry_data(resource_id),
+                )
+            )
+        return await self.async_step_import(self._entry_data(first))
+
+    def _entry_data(self, resource_id):
+        """Return the config entry data of a discovered resource."""
+        resource_data = self._resources[resource_id]
+        return {
+            CONF_USERNAME: self._username,
+            CONF_PASSWORD: self._password,
+            CONF_RESOURCE_ID: resource_id,
+            "resource_type": resource_data['baseUnit'] if resource_data['baseUnit'] else "cost",
+            "resource_name": resource_data['name']  # 添加资源名称用于识别成本资源
         }
-        response = requests.get(f"{API_URL}/resource", headers=headers)
-        response.raise_for_status()
-        resources = response.json()
+
+    async def _authenticate(self, username, password):
+        """Authenticate and return a client holding the token."""
+        client = GlowmarktApiClient(async_get_clientsession(self.hass), username, password)
+        await client.authenticate()
+        return client
+
+    async def _get_resources(self, client):
+        """Fetch available resources."""
+        resources = await client.get_resources()
         
         # 修改：返回更详细的资源信息，包括名称和类型
-        return {
-            r["resourceId"]: {
-                "name": r["name"],
-                "baseUnit": r.get("baseUnit", ""),
-                "resourceTypeId": r.get("resourceTypeId", ""),
+        return parse_resources(resources)
+
+
+class GlowmarktOptionsFlow(config_entries.OptionsFlow):
+    """Handle Glowmarkt options."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_TARIFF_TTL,
+                    default=options.get(CONF_TARIFF_TTL, DEFAULT_TARIFF_TTL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5)),
+                # 留空则只使用云端轮询
+                vol.Optional(
+                    CONF_MQTT_TOPIC,
+                    default=options.get(CONF_MQTT_TOPIC, ""),
+                ): str,
+                # 实时功率轮询间隔（秒），0 表示关闭
+                vol.Optional(
+                    CONF_POWER_INTERVAL,
+                    default=options.get(CONF_POWER_INTERVAL, DEFAULT_POWER_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                # 轮询失败后继续显示上次数据的最长时间（分钟）
+                vol.Optional(
+                    CONF_MAX_STALENESS,
+                    default=options.get(CONF_MAX_STALENESS, DEFAULT_MAX_STALENESS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
             }
-            for r in resources
-        }
+        )
+        return self.async_show_form(step_id="init", data_schema=schema)
@@ -3,6 +3,112 @@ from datetime import timedelta
 DOMAIN = "glowmarkt"
 DEFAULT_NAME = "Glowmarkt"
 DEFAULT_SCAN_INTERVAL = timedelta(minutes=1)
+REQUEST_TIMEOUT = 30  # 单次请求超时（秒）
+
+# 请求限速、重试与断路器（按账户）
+REQUEST_RATE = 1.0  # 每秒持续请求数
+REQUEST_BURST = 10
+REQUEST_MAX_RETRIES = 2
+REQUEST_BACKOFF_BASE = 2  # 秒
+REQUEST_MAX_RETRY_DELAY = 30  # 秒，超过则不在本次请求内等待
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = timedelta(minutes=5)
+BREAKER_MAX_TIMEOUT = timedelta(hours=1)
+
+# Token 生命周期：到期前在后台提前刷新
+TOKEN_REFRESH_MARGIN = timedelta(hours=12)
+TOKEN_DEFAULT_LIFETIME = timedelta(days=7)  # 认证响应缺少 exp 时使用
+TOKEN_RETRY_INTERVAL = timedelta(minutes=5)
+# 诊断：请求和更新耗时直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# 增量拉取时回看的时长，用于覆盖迟到的数据
+READINGS_RECHECK_MARGIN = timedelta(hours=1)
+
+# 自适应轮询：半小时边界后快速轮询，数据到达后放慢
+BUCKET_SECONDS = 30 * 60
+SLOTS_PER_DAY = 24 * 60 * 60 // BUCKET_SECONDS
+FAST_POLL_INTERVAL = timedelta(minutes=1)
+SLOW_POLL_INTERVAL = timedelta(minutes=10)
+FAST_POLL_WINDOW = timedelta(minutes=15)
+DEFAULT_UPLOAD_LATENCY = timedelta(minutes=2)
+LATENCY_SMOOTHING = 0.3  # 上传延迟的指数平滑系数
+
+# 账户级协调器：一次唤醒并发拉取所有资源
+ACCOUNT_FETCH_CONCURRENCY = 4
+
+# 全局调度：各账户按相位错开唤醒，所有账户合计的在途请求数有上限
+FLEET_MAX_IN_FLIGHT = 8
+FLEET_DUE_TOLERANCE = timedelta(seconds=10)  # 相位唤醒时，提前这么多到期的资源也一起轮询
+DISCOVERY_INTERVAL = timedelta(hours=24)
+
+# 缺口补数：超过宽限期仍为 0 的槽位才补，失败后指数退避
+GAP_GRACE = timedelta(minutes=30)
+REPAIR_INITIAL_BACKOFF = timedelta(minutes=5)
+REPAIR_MAX_BACKOFF = timedelta(hours=2)
+REPAIR_MAX_ATTEMPTS = 8
+
+# 本地 MQTT 推送：有推送时云端只做对账和电价刷新
+PUSH_RECONCILE_INTERVAL = timedelta(hours=1)
+PUSH_STALE_AFTER = timedelta(minutes=5)
+
+# 实时功率：独立于半小时读数的短周期轮询，默认关闭
+DEFAULT_POWER_INTERVAL = 0  # 秒，0 表示不轮询
+MIN_POWER_INTERVAL = 10  # 秒
+
+# 轮询失败或断路器打开时继续提供上次的数据，超过此时长后实体不可用
+DEFAULT_MAX_STALENESS = 180  # 分钟，0 表示失败即不可用
+
+# 电价缓存
+TARIFF_STORAGE_VERSION = 1
+TARIFF_RETRY_INTERVAL = timedelta(minutes=5)
+DEFAULT_TARIFF_TTL = 360  # 分钟
+TARIFF_TIMEZONE = "Europe/London"  # 分时电价时段按英国本地时间
+
+# 本地持久化（重启后快速恢复）
+READINGS_STORAGE_VERSION = 1
+READINGS_SAVE_DELAY = 10  # 秒
+ACCOUNT_STORAGE_VERSION = 1
+
+# 周/月/年汇总：每日从 P1D/P1M 读数对账一次
+ROLLUP_STORAGE_VERSION = 1
+ROLLUP_RECONCILE_INTERVAL = timedelta(hours=24)
+ROLLUP_RETRY_INTERVAL = timedelta(minutes=30)
+ROLLUP_DAILY_WINDOW = 31  # 天，P1D 单次请求的最大范围
+
+# 历史数据回填
+BACKFILL_STORAGE_VERSION = 1
+BACKFILL_WINDOW = timedelta(days=7)  # 每次请求的时间窗口（PT30M 最多约 10 天）
+BACKFILL_CONCURRENCY = 2
+BACKFILL_BATCH_DELAY = 2  # 秒
+BACKFILL_SEED_WINDOW = timedelta(days=1)  # 在范围边界附近查找已有统计的初始窗口，为空时逐步放大
+BACKFILL_SEED_LOOKBACK = timedelta(days=366)  # 向前查找的最大范围
+
+# 实时写入外部统计：启动时读取的最近行数，覆盖当天最多 25 个小时和之前一行
+STATISTICS_LOOKBACK = 50
+
+# 半小时数据导出，窗口和限速与回填相同
+EXPORT_STORAGE_VERSION = 1
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_NDJSON = "ndjson"
+EXPORT_FORMAT_PARQUET = "parquet"
+EXPORT_FORMATS = [EXPORT_FORMAT_CSV, EXPORT_FORMAT_NDJSON, EXPORT_FORMAT_PARQUET]
+
+# 服务
+SERVICE_BACKFILL_STATISTICS = "backfill_statistics"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_RESUME = "resume"
+SERVICE_EXPORT_READINGS = "export_readings"
+ATTR_FILENAME = "filename"
+ATTR_FORMAT = "format"
+
+# hass.data[DOMAIN] 中按用户名保存共享账户
+DATA_ACCOUNTS = "accounts"
+DATA_FLEET = "fleet"  # 所有账户共用的 FleetScheduler
+DATA_EXPORTS = "exports"  # 按文件路径保存正在运行的导出任务
 
 # 固定参数（来自Bright App）
 BRIGHT_APP_ID = "b0f1b774-a586-4f72-9edd-27ead8aa7a8d"
@@ -14,9 +120,18 @@ CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 CONF_RESOURCE_ID = "resource_id"
 CONF_RESOURCE_TYPE = "resource_type"  # 新增
+CONF_RESOURCES = "resources"  # 配置流程中选择的资源列表
+
+# 选项
+CONF_TARIFF_TTL = "tariff_ttl"
+CONF_MQTT_TOPIC = "mqtt_topic"  # 设备主题前缀，例如 glow/XXXXXXXXXXXX
+CONF_POWER_INTERVAL = "power_interval"
+CONF_MAX_STALENESS = "max_staleness"
 
 # 属性字段
 ATTR_CURRENT_USAGE = "current_usage"
 ATTR_CUMULATIVE_USAGE = "cumulative_usage"
 ATTR_UNITS = "units"
-ATTR_TIMESTAMP = "timestamp"
\ No newline at end of file
+ATTR_TIMESTAMP = "timestamp"
+ATTR_STALE_SINCE = "stale_since"
+ATTR_DATA_AGE = "data_age"  # 秒，写入状态时数据的年龄
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Diagnostics support for the Glowmarkt integration."""
+from datetime import datetime, timezone
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_USERNAME, CONF_PASSWORD
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
+
+
+def _isoformat(timestamp):
+    """Return a Unix timestamp as ISO 8601, or None."""
+    if not timestamp:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return polling cost and API health for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    account = coordinator.account
+    client = coordinator.client
+    snapshot = coordinator.data
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "resource": {
+            "last_update_success": coordinator.last_update_success,
+            "next_poll": coordinator.next_poll.isoformat() if coordinator.next_poll else None,
+            "upload_latency": coordinator.scheduler.upload_latency,
+            "readings": len(snapshot.readings) if snapshot else 0,
+            "fetched_at": snapshot.fetched_at if snapshot else None,
+            "stale": snapshot.stale if snapshot else None,
+            "max_staleness": str(coordinator.max_staleness),
+            "update": coordinator.metrics.as_dict(),
+            "tariff_cache": coordinator.tariff_cache.as_dict(),
+            "statistics": coordinator.statistics.as_dict() if coordinator.statistics is not None else None,
+            "power": (
+                {
+                    "update_interval": str(coordinator.power.update_interval),
+                    "last_update_success": coordinator.power.last_update_success,
+                }
+                if coordinator.power is not None
+                else None
+            ),
+        },
+        "account": {
+            "resources": len(account.coordinators),
+            "update_interval": str(account.coordinator.update_interval),
+            "update": account.coordinator.metrics.as_dict(),
+            "api": client.metrics.as_dict(),
+            "token_expires": _isoformat(client.token_expires),
+            "phase": account.fleet.phase(account.username),
+            "next_cycle": account.coordinator.expected_wake.isoformat() if account.coordinator.expected_wake else None,
+            "breaker": {
+                "open": client.breaker.is_open,
+                "failures": client.breaker.failures,
+                "open_until": _isoformat(client.breaker.open_until),
+            },
+        },
+        "fleet": account.fleet.as_dict(),
+    }
@@ -0,0 +1,246 @@
+"""Stream half-hour readings of one or more resources to a file."""
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .backfill import async_fetch_window, split_windows
+from .const import (
+    DOMAIN,
+    EXPORT_STORAGE_VERSION,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_NDJSON,
+    EXPORT_FORMAT_PARQUET,
+    BACKFILL_WINDOW,
+    BACKFILL_CONCURRENCY,
+    BACKFILL_BATCH_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ("timestamp", "resource_id", "resource_name", "unit", "value")
+
+
+def _rows(coordinator, readings, window_start_ts, window_end_ts):
+    """Return the export rows of one window's readings in time order."""
+    unit = coordinator.resource_type
+    rows = []
+    for item in readings:
+        if not isinstance(item, list) or len(item) < 2:
+            continue
+        ts, value = item[0], item[1]
+        if window_start_ts <= ts < window_end_ts:
+            rows.append((ts, coordinator.resource_id, coordinator.resource_name, unit, value))
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def _iso(ts):
+    """Return a bucket timestamp as an ISO 8601 UTC string."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+class _TextWriter:
+    """Append rows to a text file, resuming at a byte offset.
+
+    Every window is encoded in memory and appended with one write, so the
+    file position after it is a clean resume point.
+    """
+
+    resumable = True
+
+    def __init__(self, path, position):
+        """Open ``path``, truncating it to ``position`` or starting it afresh."""
+        if position is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, "wb")
+            self._file.write(self._header())
+        else:
+            self._file = open(path, "r+b")
+            # 丢弃上次中断时检查点之后写入的部分
+            self._file.truncate(position)
+            self._file.seek(position)
+
+    def _header(self):
+        """Return the bytes that start a new file."""
+        return b""
+
+    def _encode(self, rows):
+        """Return the bytes of ``rows``."""
+        raise NotImplementedError
+
+    def write(self, rows):
+        """Append ``rows`` and return the file position after them."""
+        if rows:
+            self._file.write(self._encode(rows))
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
+
+
+class _CsvWriter(_TextWriter):
+    """CSV with a header row."""
+
+    @staticmethod
+    def _lines(rows):
+        """Return ``rows`` as CSV lines in bytes."""
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def _header(self):
+        """Return the header row."""
+        return self._lines([EXPORT_FIELDS])
+
+    def _encode(self, rows):
+        """Return ``rows`` as CSV lines."""
+        return self._lines((_iso(row[0]), *row[1:]) for row in rows)
+
+
+class _NdjsonWriter(_TextWriter):
+    """One JSON object per line."""
+
+    def _encode(self, rows):
+        """Return ``rows`` as JSON lines."""
+        return "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, (_iso(row[0]), *row[1:])))) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+class _ParquetWriter:
+    """Parquet with one row group per window.
+
+    A Parquet file is only readable once its footer is written on close, so
+    an interrupted file cannot be appended to and the export restarts.
+    """
+
+    resumable = False
+
+    def __init__(self, path, position):
+        """Open a new Parquet file at ``path``."""
+        try:
+            # 可选依赖：只有导出 Parquet 时才需要
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as err:
+            raise HomeAssistantError("Parquet export needs the pyarrow package") from err
+        self._pa = pyarrow
+        self._schema = pyarrow.schema(
+            [
+                ("timestamp", pyarrow.timestamp("s", tz="UTC")),
+                ("resource_id", pyarrow.string()),
+                ("resource_name", pyarrow.string()),
+                ("unit", pyarrow.string()),
+                ("value", pyarrow.float64()),
+            ]
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        """Append ``rows`` as a row group."""
+        if rows:
+            columns = [list(column) for column in zip(*rows)]
+            self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+        return None
+
+    def close(self):
+        """Write the footer and close the file."""
+        self._writer.close()
+
+
+_WRITERS = {
+    EXPORT_FORMAT_CSV: _CsvWriter,
+    EXPORT_FORMAT_NDJSON: _NdjsonWriter,
+    EXPORT_FORMAT_PARQUET: _ParquetWriter,
+}
+
+
+class ReadingsExport:
+    """Stream the half-hour readings of several resources to one file.
+
+    Resources are exported one after another, each in windows that are
+    fetched a few at a time like a statistics backfill. Every window is
+    written in the executor before the next batch is fetched, so memory use
+    does not grow with the range and the event loop never waits on the disk.
+    A checkpoint with the next window and the file position is saved after
+    each window, so an interrupted CSV or NDJSON export resumes where it
+    stopped.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinators, path, export_format):
+        """Initialize the export."""
+        self._hass = hass
+        self._coordinators = coordinators
+        self.path = path
+        self.format = export_format
+        self._store = Store(hass, EXPORT_STORAGE_VERSION, f"{DOMAIN}.export_{slugify(path)}")
+
+    async def async_run(self, start: datetime, end: datetime, resume=True):
+        """Export readings from ``start`` up to ``end``."""
+        end = min(end, dt_util.utcnow())
+        job = {
+            "path": self.path,
+            "format": self.format,
+            "resources": [coordinator.resource_id for coordinator in self._coordinators],
+            "start": start.isoformat(),
+        }
+        writer_class = _WRITERS[self.format]
+        first_resource, cursor, position, rows_written = 0, start, None, 0
+
+        checkpoint = await self._store.async_load() if resume and writer_class.resumable else None
+        if checkpoint and checkpoint.get("job") == job:
+            # 文件被删除时只能从头开始
+            if await self._hass.async_add_executor_job(os.path.exists, self.path):
+                end = dt_util.parse_datetime(checkpoint["end"])
+                first_resource = checkpoint["resource"]
+                cursor = dt_util.parse_datetime(checkpoint["next"])
+                position = checkpoint["position"]
+                rows_written = checkpoint["rows"]
+                _LOGGER.info(f"Resuming export to {self.path} from {cursor}")
+
+        writer = await self._hass.async_add_executor_job(writer_class, self.path, position)
+        try:
+            for index in range(first_resource, len(self._coordinators)):
+                coordinator = self._coordinators[index]
+                windows = split_windows(cursor if index == first_resource else start, end, BACKFILL_WINDOW)
+                for batch_start in range(0, len(windows), BACKFILL_CONCURRENCY):
+                    batch = windows[batch_start:batch_start + BACKFILL_CONCURRENCY]
+                    results = await asyncio.gather(
+                        *(async_fetch_window(coordinator.client, coordinator.resource_id, *window) for window in batch)
+                    )
+                    for (window_start, window_end), readings in zip(batch, results):
+                        rows = _rows(coordinator, readings, window_start.timestamp(), window_end.timestamp())
+                        position = await self._hass.async_add_executor_job(writer.write, rows)
+                        rows_written += len(rows)
+                        await self._store.async_save(
+                            {
+                                "job": job,
+                                "end": end.isoformat(),
+                                "resource": index,
+                                "next": window_end.isoformat(),
+                                "position": position,
+                                "rows": rows_written,
+                            }
+                        )
+
+                    # 限速，避免挤占实时轮询
+                    if batch_start + BACKFILL_CONCURRENCY < len(windows):
+                        await asyncio.sleep(BACKFILL_BATCH_DELAY)
+        finally:
+            await self._hass.async_add_executor_job(writer.close)
+
+        await self._store.async_remove()
+        _LOGGER.info(f"Export to {self.path} finished: {rows_written} readings")
+        return rows_written
@@ -0,0 +1,99 @@
+"""Process-wide scheduling shared by every Glowmarkt account."""
+import asyncio
+import contextlib
+import time
+from datetime import datetime, timedelta, timezone
+
+from .metrics import Histogram
+
+
+def _spread(index):
+    """Return the ``index``-th point of the van der Corput sequence in [0, 1)."""
+    # 0, 1/2, 1/4, 3/4, 1/8 ...：任意数量的账户都大致均匀分布，新账户不需要重排旧账户
+    fraction, denominator = 0.0, 1
+    while index:
+        denominator *= 2
+        fraction += (index & 1) / denominator
+        index >>= 1
+    return fraction
+
+
+class FleetScheduler:
+    """Spread account polls across the poll interval and cap requests in flight.
+
+    Each account gets a phase offset within ``interval`` and its coordinator
+    aligns every wake-up to that phase, so many accounts no longer poll in
+    the same second. Every HTTP request of every account also holds one of
+    ``max_in_flight`` slots while it is sent. The queue depth, the time spent
+    waiting for a slot and how late account cycles start are kept for
+    diagnostics.
+    """
+
+    def __init__(self, interval: timedelta, max_in_flight):
+        """Initialize the scheduler."""
+        self.period = interval.total_seconds()
+        self.max_in_flight = max_in_flight
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._slots = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.wait = Histogram()  # 等待并发名额的时间
+        self.lag = Histogram()  # 账户周期实际开始时间相对计划的延迟
+
+    def assign(self, key):
+        """Give ``key`` the lowest free phase slot and return its offset in seconds."""
+        if key not in self._slots:
+            used = set(self._slots.values())
+            index = 0
+            while index in used:
+                index += 1
+            self._slots[key] = index
+        return self.phase(key)
+
+    def release(self, key):
+        """Free the phase slot of ``key``."""
+        self._slots.pop(key, None)
+
+    def phase(self, key):
+        """Return the phase offset of ``key`` in seconds."""
+        return _spread(self._slots.get(key, 0)) * self.period
+
+    def align(self, key, when: datetime, now: datetime) -> datetime:
+        """Return the first phase instant of ``key`` at or after ``when`` and after ``now``."""
+        ts = when.timestamp()
+        aligned = ts + (self.phase(key) - ts) % self.period
+        while aligned <= now.timestamp():
+            aligned += self.period
+        return datetime.fromtimestamp(aligned, tz=timezone.utc)
+
+    @contextlib.asynccontextmanager
+    async def request_slot(self):
+        """Hold one of the global in-flight request slots."""
+        started = time.monotonic()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.wait.observe(time.monotonic() - started)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def as_dict(self):
+        """Return the scheduler state and metrics as plain data."""
+        return {
+            "accounts": len(self._slots),
+            "period": self.period,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "slot_wait": self.wait.as_dict(),
+            "cycle_lag": self.lag.as_dict(),
+        }
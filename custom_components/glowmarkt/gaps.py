@@ -0,0 +1,139 @@
+"""Half-hour slot buffer with gap tracking for one day of readings."""
+import math
+from operator import mul
+
+from .series import ReadingSeries
+from .const import (
+    BUCKET_SECONDS,
+    GAP_GRACE,
+    REPAIR_INITIAL_BACKOFF,
+    REPAIR_MAX_BACKOFF,
+    REPAIR_MAX_ATTEMPTS,
+)
+
+
+class DayReadings:
+    """One day's half-hour readings indexed by slot.
+
+    Slot ``i`` holds the bucket starting ``i * 30`` minutes after the day's
+    first boundary. ``missing`` is a bitmap of past slots that are still zero
+    once the upload grace period has passed; only those slots are touched by
+    catch-up repair. Slots that stay zero after ``REPAIR_MAX_ATTEMPTS`` rounds
+    are accepted as real zeros.
+
+    Once ``set_rates`` has priced the slots, ``usage_cost`` is kept up to date
+    on every write instead of being recomputed from the whole day.
+    """
+
+    def __init__(self, day_start_ts):
+        """Initialize an empty day."""
+        self.base_ts = int(day_start_ts) - int(day_start_ts) % BUCKET_SECONDS
+        self.values = []
+        self.missing = 0
+        self._accepted_zero = 0
+        self._attempts = {}
+        self._next_repair_ts = 0
+        self._backoff = REPAIR_INITIAL_BACKOFF.total_seconds()
+        self.rates = None
+        self.usage_cost = 0.0
+
+    @classmethod
+    def restore(cls, day_start_ts, values):
+        """Rebuild a day from saved slot values."""
+        day = cls(day_start_ts)
+        day.values = list(values)
+        return day
+
+    def _slot(self, ts):
+        """Return the slot index for a bucket timestamp, or None if outside the day."""
+        offset = int(ts) - self.base_ts
+        if offset < 0:
+            return None
+        return offset // BUCKET_SECONDS
+
+    def update(self, ts, value):
+        """Store a reading fetched from the readings endpoint."""
+        slot = self._slot(ts)
+        if slot is None:
+            return
+        if slot >= len(self.values):
+            self.values.extend([None] * (slot + 1 - len(self.values)))
+        self._set(slot, value)
+        if value:
+            self.missing &= ~(1 << slot)
+            self._attempts.pop(slot, None)
+
+    def fill_missing(self, ts, value):
+        """Fill a missing slot from catch-up data; return True if it was filled."""
+        slot = self._slot(ts)
+        if slot is None or not value or not self.missing >> slot & 1:
+            return False
+        self._set(slot, value)
+        self.missing &= ~(1 << slot)
+        self._attempts.pop(slot, None)
+        return True
+
+    def _set(self, slot, value):
+        """Store a slot value, adjusting the usage cost by the change."""
+        if self.rates is not None and slot < len(self.rates):
+            self.usage_cost += (float(value or 0) - float(self.values[slot] or 0)) * self.rates[slot]
+        self.values[slot] = value
+
+    def set_rates(self, rates):
+        """Price every slot at ``rates`` and recompute the usage cost."""
+        self.rates = rates
+        self.usage_cost = math.fsum(map(mul, (float(value or 0) for value in self.values), rates))
+
+    def refresh_gaps(self, now_ts):
+        """Mark past zero slots as missing once their upload grace has passed."""
+        cutoff = now_ts - BUCKET_SECONDS - GAP_GRACE.total_seconds()
+        for slot, value in enumerate(self.values):
+            if self.base_ts + slot * BUCKET_SECONDS > cutoff:
+                break
+            if not value and not self._accepted_zero >> slot & 1:
+                self.missing |= 1 << slot
+
+    def missing_timestamps(self):
+        """Return bucket timestamps of the missing slots."""
+        return [
+            self.base_ts + slot * BUCKET_SECONDS
+            for slot in range(len(self.values))
+            if self.missing >> slot & 1
+        ]
+
+    def repair_due(self, now_ts):
+        """Return True if there are gaps and the repair backoff has elapsed."""
+        return bool(self.missing) and now_ts >= self._next_repair_ts
+
+    def record_repair(self, now_ts, filled):
+        """Back off after a repair round and give up on slots that stay zero."""
+        if filled:
+            self._backoff = REPAIR_INITIAL_BACKOFF.total_seconds()
+        else:
+            self._backoff = min(self._backoff * 2, REPAIR_MAX_BACKOFF.total_seconds())
+        self._next_repair_ts = now_ts + self._backoff
+
+        for slot in range(len(self.values)):
+            if not self.missing >> slot & 1:
+                continue
+            self._attempts[slot] = self._attempts.get(slot, 0) + 1
+            if self._attempts[slot] >= REPAIR_MAX_ATTEMPTS:
+                # 多次补数后仍为 0，视为真实的零用量
+                self.missing &= ~(1 << slot)
+                self._accepted_zero |= 1 << slot
+                self._attempts.pop(slot)
+
+    def last_settled_ts(self):
+        """Return the timestamp of the newest non-zero slot."""
+        for slot in range(len(self.values) - 1, -1, -1):
+            if self.values[slot]:
+                return self.base_ts + slot * BUCKET_SECONDS
+        return None
+
+    def series(self):
+        """Return the day as a ``ReadingSeries``."""
+        series = ReadingSeries()
+        for slot, value in enumerate(self.values):
+            if value is not None:
+                series.set(self.base_ts + slot * BUCKET_SECONDS, value)
+        return series
@@ -0,0 +1,344 @@
+"""Account-level state shared by every config entry of one Bright login."""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .api import GlowmarktApiClient, GlowmarktApiError, parse_resources
+from .fleet import FleetScheduler
+from .metrics import UpdateMetrics
+from .const import (
+    DOMAIN,
+    DATA_ACCOUNTS,
+    DATA_FLEET,
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    ACCOUNT_STORAGE_VERSION,
+    READINGS_SAVE_DELAY,
+    FAST_POLL_INTERVAL,
+    SLOW_POLL_INTERVAL,
+    ACCOUNT_FETCH_CONCURRENCY,
+    FLEET_MAX_IN_FLIGHT,
+    FLEET_DUE_TOLERANCE,
+    DISCOVERY_INTERVAL,
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_RETRY_INTERVAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _account_store(hass: HomeAssistant, username):
+    """Return the store holding an account's token and resources."""
+    return Store(hass, ACCOUNT_STORAGE_VERSION, f"{DOMAIN}.account_{username}")
+
+
+class GlowmarktAccount:
+    """Owns the API client and token for one Bright account.
+
+    The token and its expiry are persisted, and a timer renews the token in
+    the background ``TOKEN_REFRESH_MARGIN`` before it expires, so polls keep
+    using a valid token instead of discovering expiry through a 401. The last
+    discovered resource list is persisted beside it, so a restart or a newly
+    added entry does not rediscover before it is due.
+    """
+
+    def __init__(self, hass: HomeAssistant, username, password, fleet: FleetScheduler):
+        """Initialize the account hub."""
+        self._hass = hass
+        self.username = username
+        self.fleet = fleet
+        fleet.assign(username)
+        self.client = GlowmarktApiClient(
+            async_get_clientsession(hass),
+            username,
+            password,
+            token_listener=self._async_token_changed,
+            request_slot=fleet.request_slot,
+        )
+        self.entry_ids = set()
+        self.coordinators = {}
+        self.coordinator = GlowmarktAccountCoordinator(hass, self)
+        self._listener_removers = {}
+        self._unsub_token_refresh = None
+        self._token_refresh_task = None
+        self._store = _account_store(hass, username)
+        self.load_task = hass.async_create_task(self._async_load())
+
+    async def _async_load(self):
+        """Restore the saved token so restarts do not need a fresh login."""
+        stored = await self._store.async_load()
+        if stored and not self.client.token:
+            self.client.token = stored.get("token")
+            self.client.token_expires = stored.get("exp")
+        if stored and stored.get("resources") and stored.get("discovered_at"):
+            self.coordinator.async_restore_resources(stored["resources"], stored["discovered_at"])
+        self._async_schedule_token_refresh()
+
+    def _data_to_save(self):
+        """Return the token and discovery state to persist."""
+        return {
+            "token": self.client.token,
+            "exp": self.client.token_expires,
+            "resources": self.coordinator.resources,
+            "discovered_at": self.coordinator.discovered_at,
+        }
+
+    @callback
+    def async_save(self):
+        """Persist the account state after a short delay."""
+        self._store.async_delay_save(self._data_to_save, READINGS_SAVE_DELAY)
+
+    @callback
+    def _async_token_changed(self):
+        """Persist a newly issued token and plan its renewal."""
+        self.async_save()
+        self._async_schedule_token_refresh()
+
+    @callback
+    def _async_schedule_token_refresh(self, when=None):
+        """Arm the timer that renews the token before it expires."""
+        if self._unsub_token_refresh is not None:
+            self._unsub_token_refresh()
+            self._unsub_token_refresh = None
+        if when is None:
+            if not self.client.token or self.client.token_expires is None:
+                # 旧版本保存的 token 没有过期时间，只能依赖 401 重新登录
+                return
+            now = dt_util.utcnow()
+            expires = datetime.fromtimestamp(self.client.token_expires, tz=timezone.utc)
+            # 有效期短于提前量时，在剩余时间过半时续期，避免反复登录
+            when = max(expires - TOKEN_REFRESH_MARGIN, now + (expires - now) / 2)
+        self._unsub_token_refresh = async_track_point_in_utc_time(
+            self._hass, self._async_token_refresh_due, when
+        )
+
+    @callback
+    def _async_token_refresh_due(self, now):
+        """Start a background token renewal."""
+        self._unsub_token_refresh = None
+        self._token_refresh_task = self._hass.async_create_background_task(
+            self._async_refresh_token(), f"{DOMAIN} token refresh {self.username}"
+        )
+
+    async def _async_refresh_token(self):
+        """Renew the token, retrying later on failure."""
+        try:
+            await self.client.async_refresh_token()
+        except GlowmarktApiError as err:
+            _LOGGER.warning(f"Failed to renew Glowmarkt token: {err}")
+            retry = dt_util.utcnow() + TOKEN_RETRY_INTERVAL
+            if self.client.breaker.is_open:
+                retry = max(retry, datetime.fromtimestamp(self.client.breaker.open_until, tz=timezone.utc))
+            self._async_schedule_token_refresh(retry)
+
+    @callback
+    def async_close(self):
+        """Cancel the token renewal timer when the account is no longer used."""
+        self.fleet.release(self.username)
+        if self._unsub_token_refresh is not None:
+            self._unsub_token_refresh()
+            self._unsub_token_refresh = None
+        if self._token_refresh_task is not None:
+            self._token_refresh_task.cancel()
+            self._token_refresh_task = None
+
+    @callback
+    def async_register(self, coordinator):
+        """Let the account coordinator drive a resource coordinator's polls."""
+        entry_id = coordinator.entry.entry_id
+        self.coordinators[entry_id] = coordinator
+        if not self._listener_removers:
+            # 第一次启动定时器时就对齐到本账户的相位
+            self.coordinator.async_align_next_cycle(dt_util.utcnow() + FAST_POLL_INTERVAL)
+        # 账户协调器只有存在监听者时才会定时运行
+        self._listener_removers[entry_id] = self.coordinator.async_add_listener(lambda: None)
+
+    @callback
+    def async_unregister(self, entry_id):
+        """Stop polling a resource coordinator."""
+        self.coordinators.pop(entry_id, None)
+        remove_listener = self._listener_removers.pop(entry_id, None)
+        if remove_listener is not None:
+            remove_listener()
+
+
+class GlowmarktAccountCoordinator(DataUpdateCoordinator):
+    """Single timer that polls every resource of an account together.
+
+    Each cycle checks the token once, then refreshes every resource whose
+    adaptive schedule is due with bounded concurrency. When the login fails
+    the due resources are still refreshed, serving their last snapshot
+    without requests of their own until it is too old. The resource
+    coordinators have no timer of their own; their refresh notifies their
+    entities as usual. The account's resource list is rediscovered daily.
+    Wake-ups land on the account's phase from the ``FleetScheduler``; a
+    resource due within ``FLEET_DUE_TOLERANCE`` of a wake-up is polled in it,
+    so the few seconds a cycle takes do not push it to the next phase.
+    """
+
+    def __init__(self, hass: HomeAssistant, account: GlowmarktAccount):
+        """Initialize the account coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"Glowmarkt account {account.username}",
+            update_interval=FAST_POLL_INTERVAL,
+        )
+        self.account = account
+        self.resources = {}
+        self.discovered_at = None  # Unix 时间戳
+        self._next_discovery = None
+        self._semaphore = asyncio.Semaphore(ACCOUNT_FETCH_CONCURRENCY)
+        self.metrics = UpdateMetrics()
+        self.expected_wake = None
+        self.auth_error = None  # 本轮登录失败的原因，只在轮询期间设置
+
+    @callback
+    def async_align_next_cycle(self, when):
+        """Schedule the next cycle at the account's first phase instant from ``when``."""
+        fleet = self.account.fleet
+        now = dt_util.utcnow()
+        self.expected_wake = fleet.align(self.account.username, when - FLEET_DUE_TOLERANCE, now)
+        self.update_interval = self.expected_wake - now
+
+    @callback
+    def async_restore_resources(self, resources, discovered_at):
+        """Start from a saved resource list and rediscover when it is due."""
+        self.resources = resources
+        self.discovered_at = discovered_at
+        self._next_discovery = datetime.fromtimestamp(discovered_at, tz=timezone.utc) + DISCOVERY_INTERVAL
+
+    async def _async_discover(self, now):
+        """Refresh the list of resources on the account when due."""
+        if self._next_discovery is not None and now < self._next_discovery:
+            return
+        try:
+            self.resources = parse_resources(await self.account.client.get_resources())
+            self.discovered_at = now.timestamp()
+            self._next_discovery = now + DISCOVERY_INTERVAL
+            self.account.async_save()
+        except Exception as err:
+            _LOGGER.warning(f"Failed to discover Glowmarkt resources: {err}")
+            self._next_discovery = now + SLOW_POLL_INTERVAL
+            return
+
+        configured = {c.resource_id for c in self.account.coordinators.values()}
+        for resource_id, resource in self.resources.items():
+            if resource_id not in configured:
+                _LOGGER.debug("Resource %s (%s) has no config entry", resource_id, resource["name"])
+
+    async def _async_refresh_resource(self, coordinator):
+        """Refresh one resource coordinator under the concurrency limit."""
+        async with self._semaphore:
+            await coordinator.async_refresh()
+
+    async def _async_update_data(self):
+        """Poll all due resources of the account in parallel."""
+        client = self.account.client
+        started = time.monotonic()
+        now = dt_util.utcnow()
+        if self.expected_wake is not None:
+            self.account.fleet.lag.observe(max((now - self.expected_wake).total_seconds(), 0))
+            self.expected_wake = None
+        coordinators = list(self.account.coordinators.values())
+        try:
+            if not client.breaker.is_open:
+                try:
+                    # 正常情况下 token 已在后台提前续期，这里只处理缺失或已过期
+                    await client.async_ensure_token()
+                except Exception as err:
+                    # 资源协调器不再各自登录，只提供缓存数据直到过期
+                    self.auth_error = err
+                else:
+                    await self._async_discover(now)
+
+            # 断路器打开时资源协调器不会发请求，只会把缓存数据标记为过期
+            # 唤醒时间按相位取整，稍早于到期时间的资源也在本次轮询
+            horizon = now + FLEET_DUE_TOLERANCE
+            due = [c for c in coordinators if c.poll_due_at() is None or c.poll_due_at() <= horizon]
+            if due:
+                await asyncio.gather(*(self._async_refresh_resource(c) for c in due))
+        finally:
+            auth_error, self.auth_error = self.auth_error, None
+            # 下一次唤醒时间取所有资源中最早的那个；失败时也要重新对齐
+            # 推送中的资源在推送可能中断时唤醒，检查是否恢复云端轮询
+            next_polls = [c.poll_due_at() for c in coordinators if c.poll_due_at() is not None]
+            now = dt_util.utcnow()
+            if next_polls and len(next_polls) == len(coordinators):
+                self.async_align_next_cycle(max(now + FAST_POLL_INTERVAL, min(next_polls)))
+            else:
+                self.async_align_next_cycle(now + FAST_POLL_INTERVAL)
+
+        self.metrics.record_update(time.monotonic() - started)
+        if auth_error is not None:
+            self.metrics.failures += 1
+            raise UpdateFailed(f"Authentication failed: {auth_error}") from auth_error
+        return {
+            "resources": self.resources,
+            "polled": [c.resource_id for c in due],
+            "paused": client.breaker.is_open,
+        }
+
+
+async def async_get_account(hass: HomeAssistant, entry: ConfigEntry) -> GlowmarktAccount:
+    """Return the hub for an entry's account, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    accounts = domain_data.setdefault(DATA_ACCOUNTS, {})
+    username = entry.data[CONF_USERNAME]
+
+    account = accounts.get(username)
+    if account is None:
+        _LOGGER.debug("Creating shared Glowmarkt account hub for %s", username)
+        fleet = domain_data.get(DATA_FLEET)
+        if fleet is None:
+            fleet = domain_data[DATA_FLEET] = FleetScheduler(FAST_POLL_INTERVAL, FLEET_MAX_IN_FLIGHT)
+        account = GlowmarktAccount(hass, username, entry.data[CONF_PASSWORD], fleet)
+        accounts[username] = account
+
+    account.entry_ids.add(entry.entry_id)
+    await account.load_task
+    return account
+
+
+async def async_seed_account(hass: HomeAssistant, username, token, token_expires, resources):
+    """Save a config flow's login and discovery for the account hub to start from.
+
+    Entries created from the flow then make their first refresh without
+    logging in or rediscovering. An account hub that is already running
+    keeps its own state.
+    """
+    if username in hass.data.get(DOMAIN, {}).get(DATA_ACCOUNTS, {}):
+        return
+    await _account_store(hass, username).async_save(
+        {
+            "token": token,
+            "exp": token_expires,
+            "resources": resources,
+            "discovered_at": time.time(),
+        }
+    )
+
+
+def async_release_account(hass: HomeAssistant, entry: ConfigEntry):
+    """Drop an entry from its account hub, removing the hub when unused."""
+    accounts = hass.data.get(DOMAIN, {}).get(DATA_ACCOUNTS, {})
+    username = entry.data[CONF_USERNAME]
+
+    account = accounts.get(username)
+    if account is None:
+        return
+
+    account.entry_ids.discard(entry.entry_id)
+    account.async_unregister(entry.entry_id)
+    if not account.entry_ids:
+        accounts.pop(username)
+        account.async_close()
@@ -0,0 +1,134 @@
+"""Lightweight counters and latency histograms for diagnostics."""
+from bisect import bisect_left
+from collections import Counter
+
+from .const import LATENCY_BUCKETS
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # 最后一个桶收集超出上限的值
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Record one duration."""
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        """Return the mean duration, or None when empty."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding quantile ``q``."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                # 桶上限不会超过实际观测到的最大值
+                return min(LATENCY_BUCKETS[index], self.max) if index < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self):
+        """Return the histogram as plain data."""
+        buckets = {f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p95": self.quantile(0.95),
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class ApiMetrics:
+    """Request counters and per-endpoint latency for one account's client."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.latency = {}
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.errors = 0
+        self.unauthorized = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.bytes_received = 0
+
+    @property
+    def total_requests(self):
+        """Return the number of requests sent."""
+        return sum(self.requests.values())
+
+    def record(self, endpoint, status, duration, size=0):
+        """Record one HTTP attempt; ``status`` is None when no response arrived."""
+        self.requests[endpoint] += 1
+        self.latency.setdefault(endpoint, Histogram()).observe(duration)
+        self.bytes_received += size
+        self.statuses[status if status is not None else "error"] += 1
+        if status == 401:
+            self.unauthorized += 1
+        elif status == 429:
+            self.rate_limited += 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def latency_quantile(self, q):
+        """Return quantile ``q`` of the slowest endpoint, or None."""
+        values = [h.quantile(q) for h in self.latency.values() if h.count]
+        return max(values) if values else None
+
+    def as_dict(self):
+        """Return the metrics as plain data."""
+        return {
+            "requests": dict(self.requests),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "errors": self.errors,
+            "unauthorized": self.unauthorized,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "bytes_received": self.bytes_received,
+            "latency": {endpoint: h.as_dict() for endpoint, h in self.latency.items()},
+        }
+
+
+class UpdateMetrics:
+    """Duration and outcome of a coordinator's updates."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.duration = Histogram()
+        self.last_duration = None
+        self.failures = 0
+        self.catchup_runs = 0
+        self.slots_repaired = 0
+
+    def record_update(self, duration):
+        """Record how long one update took."""
+        self.duration.observe(duration)
+        self.last_duration = duration
+
+    def as_dict(self):
+        """Return the metrics as plain data."""
+        return {
+            "updates": self.duration.count,
+            "failures": self.failures,
+            "last_duration": self.last_duration,
+            "duration": self.duration.as_dict(),
+            "catchup_runs": self.catchup_runs,
+            "slots_repaired": self.slots_repaired,
+        }
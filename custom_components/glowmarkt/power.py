@@ -0,0 +1,72 @@
+"""Short-interval polling lane for a resource's instantaneous power."""
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .api import GlowmarktApiClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PowerReading:
+    """One instantaneous reading from the ``current`` endpoint."""
+
+    watts: float
+    timestamp: float = field(compare=False)
+
+
+def parse_current(api_data):
+    """Return the newest reading of a ``current`` response in W, or None."""
+    readings = [
+        item for item in api_data.get("data", []) if isinstance(item, list) and len(item) >= 2 and item[1] is not None
+    ]
+    if not readings:
+        return None
+    timestamp, value = max(readings)
+    try:
+        watts = float(value)
+    except (TypeError, ValueError):
+        return None
+    if api_data.get("units") == "kW":
+        watts *= 1000
+    return PowerReading(watts=round(watts, 1), timestamp=timestamp)
+
+
+class GlowmarktPowerCoordinator(DataUpdateCoordinator):
+    """Poll a resource's ``current`` reading on its own short interval.
+
+    Runs beside the half-hour readings coordinator and shares the account's
+    client, so it reuses the session, token and request pacing. Readings
+    compare on their value alone, so a poll that returns the same power does
+    not notify the sensor.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: GlowmarktApiClient, resource_id, interval: timedelta):
+        """Initialize the power lane."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"Glowmarkt power {resource_id}",
+            update_interval=interval,
+            always_update=False,
+        )
+        self.client = client
+        self.resource_id = resource_id
+
+    async def _async_update_data(self):
+        """Fetch the latest instantaneous reading."""
+        if self.client.breaker.is_open and self.data is not None:
+            # 断路器打开时不发请求，保留上次的功率
+            return self.data
+        try:
+            api_data = await self.client.get_current(self.resource_id)
+        except Exception as err:
+            raise UpdateFailed(f"Failed to fetch current power: {err}") from err
+        reading = parse_current(api_data)
+        if reading is None:
+            raise UpdateFailed("Current reading response has no data")
+        return reading
@@ -0,0 +1,92 @@
+"""Half-hour rate schedules compiled from Glowmarkt tariff plans."""
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from operator import mul
+from zoneinfo import ZoneInfo
+
+from .const import BUCKET_SECONDS, SLOTS_PER_DAY, TARIFF_TIMEZONE
+
+_TARIFF_TZ = ZoneInfo(TARIFF_TIMEZONE)
+
+
+def _slot_of(value):
+    """Return the local half-hour slot of an ``HH:MM`` time, or None."""
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":")[:2])
+    except (TypeError, ValueError):
+        return None
+    if not (0 <= hours <= 24 and 0 <= minutes < 60):
+        return None
+    return (hours * 60 + minutes) // 30 % SLOTS_PER_DAY
+
+
+@dataclass(frozen=True, slots=True)
+class RateSchedule:
+    """Unit rate of every local half-hour of the day in GBP/kWh.
+
+    Slot ``i`` covers ``i * 30`` minutes after local midnight, so time-of-use
+    windows follow the clock across daylight saving changes.
+    """
+
+    rates: tuple
+    standing_charge: float  # GBP/day
+    time_of_use: bool
+
+    @property
+    def mean_rate(self):
+        """Return the time-weighted average rate over the day."""
+        return math.fsum(self.rates) / len(self.rates)
+
+    def rate_at(self, ts):
+        """Return the rate of the half-hour bucket containing ``ts``."""
+        local = datetime.fromtimestamp(ts, tz=_TARIFF_TZ)
+        return self.rates[(local.hour * 60 + local.minute) // 30]
+
+    def rates_for(self, base_ts, count):
+        """Return the rates of ``count`` consecutive buckets from ``base_ts``."""
+        return [self.rate_at(base_ts + slot * BUCKET_SECONDS) for slot in range(count)]
+
+    def usage_cost(self, readings):
+        """Return the cost of a ``ReadingSeries`` without the standing charge."""
+        rates = [self.rate_at(ts) for ts in readings.timestamps]
+        return math.fsum(map(mul, readings.values, rates))
+
+
+def compile_schedule(tariff) -> RateSchedule:
+    """Compile a tariff's plan into a half-hour ``RateSchedule``.
+
+    ``planDetail`` tiers that carry ``startTime``/``endTime`` (``HH:MM``,
+    local time, end exclusive and wrapping past midnight) are laid out over
+    the day; every other slot uses the current rate. Without windows the
+    schedule is flat, matching the old ``currentRates`` calculation.
+    """
+    current_rates = tariff.get("currentRates", {})
+    details = [
+        detail
+        for detail in (tariff.get("plan") or [{}])[0].get("planDetail", [])
+        if detail.get("rate") is not None
+    ]
+    default = current_rates.get("rate")
+    if default is None:
+        default = details[0]["rate"] if details else 0
+
+    # 从便士转换为英镑
+    rates = [default / 100] * SLOTS_PER_DAY
+    for detail in details:
+        start = _slot_of(detail.get("startTime"))
+        end = _slot_of(detail.get("endTime"))
+        if start is None or end is None:
+            continue
+        slot = start
+        while True:
+            rates[slot] = detail["rate"] / 100
+            slot = (slot + 1) % SLOTS_PER_DAY
+            if slot == end:
+                break
+
+    return RateSchedule(
+        rates=tuple(rates),
+        standing_charge=current_rates.get("standingCharge", 0) / 100,
+        time_of_use=len(set(rates)) > 1,
+    )
@@ -0,0 +1,103 @@
+"""Local MQTT push from Glow IHD/CAD devices."""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import PUSH_STALE_AFTER
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class MeterReading:
+    """One meter register reading published by a Glow device."""
+
+    timestamp: float
+    cumulative: float
+
+
+def is_gas_resource(resource_type, resource_name):
+    """Return True for a gas resource, which Glowmarkt may also report in kWh."""
+    return resource_type == "m³" or "gas" in resource_name.lower()
+
+
+def meter_topic(topic_prefix, resource_type, resource_name):
+    """Return the device topic carrying a resource's meter readings."""
+    # 设备主题形如 glow/<设备 ID>/SENSOR/electricitymeter
+    meter = "gasmeter" if is_gas_resource(resource_type, resource_name) else "electricitymeter"
+    return f"{topic_prefix.rstrip('/')}/SENSOR/{meter}"
+
+
+def parse_meter_payload(payload, resource_type):
+    """Parse a Glow ``electricitymeter``/``gasmeter`` payload, or return None.
+
+    Volume resources read the ``cumulativevol`` register, everything else the
+    energy ``cumulative`` register in kWh.
+    """
+    try:
+        data = json.loads(payload)
+        meter = data.get("electricitymeter") or data.get("gasmeter")
+        energy = meter["energy"]["import"]
+        key = "cumulativevol" if resource_type == "m³" else "cumulative"
+        cumulative = float(energy[key])
+        timestamp = dt_util.parse_datetime(meter["timestamp"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    if timestamp is None:
+        return None
+    return MeterReading(timestamp=timestamp.timestamp(), cumulative=cumulative)
+
+
+class MqttPushSource:
+    """Feed a coordinator from the device's MQTT topic.
+
+    Readings arrive every few seconds and are handed to the coordinator,
+    which turns register deltas into the current half-hour bucket. While
+    messages keep arriving, the coordinator polls the cloud only to
+    reconcile settled buckets and refresh the tariff.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator, topic):
+        """Initialize the push source."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self.topic = topic
+        self.last_message = None
+        self._unsubscribe = None
+
+    async def async_start(self):
+        """Subscribe to the device topic; return False if MQTT is not available."""
+        # MQTT 是可选依赖，只在启用推送时导入
+        from homeassistant.components import mqtt
+
+        if not await mqtt.async_wait_for_mqtt_client(self._hass):
+            _LOGGER.warning("MQTT is not available, using cloud polling for %s", self.topic)
+            return False
+        self._unsubscribe = await mqtt.async_subscribe(self._hass, self.topic, self._async_message_received)
+        _LOGGER.debug("Subscribed to %s", self.topic)
+        return True
+
+    @callback
+    def async_stop(self):
+        """Unsubscribe from the device topic."""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def active(self, now: datetime):
+        """Return True while the device is publishing."""
+        return self.last_message is not None and now - self.last_message < PUSH_STALE_AFTER
+
+    @callback
+    def _async_message_received(self, msg):
+        """Pass a parsed meter reading to the coordinator."""
+        reading = parse_meter_payload(msg.payload, self._coordinator.resource_type)
+        if reading is None:
+            _LOGGER.debug("Ignoring unparseable payload on %s", msg.topic)
+            return
+        self.last_message = dt_util.utcnow()
+        self._coordinator.async_handle_push(reading)
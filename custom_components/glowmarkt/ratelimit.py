@@ -0,0 +1,88 @@
+"""Request pacing and failure isolation for the Glowmarkt API client."""
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """Limit the sustained request rate while allowing short bursts."""
+
+    def __init__(self, rate, capacity):
+        """Initialize a full bucket refilling ``rate`` tokens per second."""
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class CircuitBreaker:
+    """Stop calling the API after repeated transient failures.
+
+    After ``threshold`` consecutive failures the breaker opens for
+    ``reset_timeout`` seconds, doubling up to ``max_timeout`` each time a
+    trial request after reopening fails again. A long ``Retry-After`` from
+    the server opens it for at least that long.
+    """
+
+    def __init__(self, threshold, reset_timeout, max_timeout):
+        """Initialize a closed breaker."""
+        self._threshold = threshold
+        self._reset_timeout = reset_timeout
+        self._max_timeout = max_timeout
+        self._timeout = reset_timeout
+        self.failures = 0
+        self.open_until = 0.0
+
+    @property
+    def is_open(self):
+        """Return True while requests should not be sent."""
+        return time.time() < self.open_until
+
+    def record_success(self):
+        """Close the breaker after a successful request."""
+        self.failures = 0
+        self._timeout = self._reset_timeout
+        self.open_until = 0.0
+
+    def record_failure(self, retry_after=None):
+        """Count a transient failure and open the breaker when needed."""
+        now = time.time()
+        self.failures += 1
+        if retry_after is not None:
+            self.open_until = max(self.open_until, now + retry_after)
+        if self.failures >= self._threshold:
+            self.open_until = max(self.open_until, now + self._timeout)
+            self._timeout = min(self._timeout * 2, self._max_timeout)
+
+
+def backoff_delay(attempt, base, cap):
+    """Return an exponential backoff delay with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    """Parse a ``Retry-After`` header as seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
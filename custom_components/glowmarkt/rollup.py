@@ -0,0 +1,203 @@
+"""Week, month and year usage totals kept next to the coordinator."""
+import logging
+import math
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import GlowmarktApiClient
+from .const import (
+    DOMAIN,
+    READINGS_SAVE_DELAY,
+    ROLLUP_STORAGE_VERSION,
+    ROLLUP_RECONCILE_INTERVAL,
+    ROLLUP_RETRY_INTERVAL,
+    ROLLUP_DAILY_WINDOW,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class RollupTotals:
+    """Usage of the completed days of the current week, month and year."""
+
+    week: float
+    week_days: int
+    month: float
+    month_days: int
+    year: float
+    year_days: int
+
+
+def _api_time(value: date):
+    """Format the UTC start of a day for the readings endpoint."""
+    return value.strftime("%Y-%m-%dT00:00:00")
+
+
+class RollupCache:
+    """Daily and monthly usage totals for the current year.
+
+    Daily totals live in an ``array('d')`` starting at the Monday of the
+    week that contains 1 January, so week, month and year totals are slice
+    sums. A day is recorded from the coordinator's half-hour buffer when it
+    rolls over; once a day the cache is reconciled against ``P1D`` readings
+    for the current month and week and ``P1M`` readings for the closed
+    months. Days are UTC days, like the coordinator's buffer.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: GlowmarktApiClient, resource_id):
+        """Initialize the cache."""
+        self._client = client
+        self._resource_id = resource_id
+        self._store = Store(hass, ROLLUP_STORAGE_VERSION, f"{DOMAIN}.rollup_{resource_id}")
+        self._loaded = False
+        self._year = None
+        self._base = None  # days[0] 对应的日期序数
+        self.days = array("d")
+        self.months = array("d")  # 已结束月份的 P1M 总量，未对账为 NaN
+        self._next_reconcile = None
+
+    def _reset(self, year):
+        """Start a new year, keeping the days that still fall inside it."""
+        base = date(year, 1, 1)
+        base = (base - timedelta(days=base.weekday())).toordinal()
+        days = array("d", bytes(8 * (date(year, 12, 31).toordinal() - base + 1)))
+        if self._base is not None:
+            # 跨年时保留新一年第一周里属于上一年的那几天
+            for ordinal in range(base, base + 7):
+                index = ordinal - self._base
+                if 0 <= index < len(self.days):
+                    days[ordinal - base] = self.days[index]
+        self._year = year
+        self._base = base
+        self.days = days
+        self.months = array("d", [math.nan] * 12)
+
+    def _index(self, day: date):
+        """Return the array index of a day, or None if outside the year."""
+        index = day.toordinal() - self._base
+        return index if 0 <= index < len(self.days) else None
+
+    async def async_load(self):
+        """Restore the totals from storage."""
+        self._loaded = True
+        stored = await self._store.async_load()
+        if not stored:
+            return
+        self._year = stored["year"]
+        self._base = stored["base"]
+        self.days = array("d", stored["days"])
+        self.months = array("d", [math.nan if value is None else value for value in stored["months"]])
+        self._next_reconcile = dt_util.parse_datetime(stored.get("next_reconcile") or "")
+
+    def _data_to_save(self):
+        """Return the totals as JSON-serialisable data."""
+        return {
+            "year": self._year,
+            "base": self._base,
+            "days": list(self.days),
+            "months": [None if math.isnan(value) else value for value in self.months],
+            "next_reconcile": self._next_reconcile.isoformat() if self._next_reconcile else None,
+        }
+
+    def _ensure_year(self, today: date):
+        """Make sure the arrays cover ``today``'s year."""
+        if self._year != today.year:
+            self._reset(today.year)
+
+    def record_day(self, day: date, total):
+        """Store the total of a completed day from the half-hour buffer."""
+        if self._year is None or day.year > self._year:
+            self._ensure_year(day)
+        index = self._index(day)
+        if index is None:
+            return
+        self.days[index] = total
+        self._store.async_delay_save(self._data_to_save, READINGS_SAVE_DELAY)
+
+    def totals(self, today: date) -> RollupTotals:
+        """Return the completed-day totals for ``today``'s week, month and year."""
+        self._ensure_year(today)
+        end = self._index(today)
+        week_start = end - today.weekday()
+        month_start = self._index(today.replace(day=1))
+        year_start = self._index(today.replace(month=1, day=1))
+
+        # 已结束的月份优先使用 P1M 对账值，否则用每日总量求和
+        closed_months = 0.0
+        for month in range(today.month - 1):
+            value = self.months[month]
+            if math.isnan(value):
+                first = self._index(date(today.year, month + 1, 1))
+                last = self._index(date(today.year, month + 2, 1))
+                value = math.fsum(self.days[first:last])
+            closed_months += value
+        month = math.fsum(self.days[month_start:end])
+
+        return RollupTotals(
+            week=math.fsum(self.days[week_start:end]),
+            week_days=end - week_start,
+            month=month,
+            month_days=end - month_start,
+            year=closed_months + month,
+            year_days=end - year_start,
+        )
+
+    async def async_reconcile(self, now: datetime, today: date):
+        """Re-read completed days and months from the API when due."""
+        if not self._loaded:
+            await self.async_load()
+        self._ensure_year(today)
+        if self._next_reconcile is not None and now < self._next_reconcile:
+            return
+
+        try:
+            await self._async_reconcile(today)
+        except Exception as err:
+            _LOGGER.warning(f"Failed to reconcile usage totals: {err}")
+            self._next_reconcile = now + ROLLUP_RETRY_INTERVAL
+            return
+        self._next_reconcile = now + ROLLUP_RECONCILE_INTERVAL
+        self._store.async_delay_save(self._data_to_save, READINGS_SAVE_DELAY)
+
+    async def _async_reconcile(self, today: date):
+        """Fetch ``P1D`` readings for this month and week and ``P1M`` for closed months."""
+        month_start = today.replace(day=1)
+        cursor = min(month_start, today - timedelta(days=today.weekday()))
+        while cursor < today:
+            window_end = min(cursor + timedelta(days=ROLLUP_DAILY_WINDOW), today)
+            api_data = await self._client.get_readings(
+                self._resource_id,
+                _api_time(cursor),
+                (window_end - timedelta(days=1)).strftime("%Y-%m-%dT23:59:59"),
+                period="P1D",
+            )
+            for ts, value in self._pairs(api_data):
+                index = self._index(datetime.fromtimestamp(ts, tz=timezone.utc).date())
+                if index is not None and index < self._index(today):
+                    self.days[index] = value
+            cursor = window_end
+
+        if today.month > 1:
+            api_data = await self._client.get_readings(
+                self._resource_id,
+                _api_time(date(today.year, 1, 1)),
+                (month_start - timedelta(days=1)).strftime("%Y-%m-%dT23:59:59"),
+                period="P1M",
+            )
+            for ts, value in self._pairs(api_data):
+                start = datetime.fromtimestamp(ts, tz=timezone.utc).date()
+                if start.year == today.year and start.month < today.month:
+                    self.months[start.month - 1] = value
+
+    @staticmethod
+    def _pairs(api_data):
+        """Yield ``(timestamp, value)`` from a readings response."""
+        for item in api_data.get("data", []):
+            if isinstance(item, list) and len(item) >= 2:
+                yield item[0], float(item[1] or 0)
@@ -0,0 +1,74 @@
+"""Half-hour boundary aware polling schedule for Glowmarkt coordinators."""
+from datetime import datetime, timedelta
+
+from .const import (
+    BUCKET_SECONDS,
+    FAST_POLL_INTERVAL,
+    FAST_POLL_WINDOW,
+    SLOW_POLL_INTERVAL,
+    DEFAULT_UPLOAD_LATENCY,
+    LATENCY_SMOOTHING,
+)
+
+
+class AdaptivePollScheduler:
+    """Decide how long a coordinator should wait before its next poll.
+
+    New half-hour buckets only appear shortly after each :00/:30 boundary,
+    once the meter data has been uploaded. The scheduler polls quickly while
+    the newest bucket is due, then sleeps until the next boundary plus the
+    resource's learned upload latency.
+    """
+
+    def __init__(self):
+        """Initialize the scheduler."""
+        self.upload_latency = DEFAULT_UPLOAD_LATENCY.total_seconds()
+        self._last_bucket_ts = None
+
+    @staticmethod
+    def _boundary(now_ts):
+        """Return the most recent half-hour boundary as a timestamp."""
+        return now_ts - (now_ts % BUCKET_SECONDS)
+
+    def observe(self, now: datetime, latest_bucket_ts):
+        """Record the newest settled bucket seen and learn upload latency from it."""
+        if latest_bucket_ts is None:
+            return
+        if self._last_bucket_ts is not None and latest_bucket_ts > self._last_bucket_ts:
+            # 只用刚刚结束的那个桶估算上传延迟，补传的旧桶不算
+            now_ts = now.timestamp()
+            expected = self._boundary(now_ts) - BUCKET_SECONDS
+            if latest_bucket_ts >= expected:
+                sample = now_ts - (latest_bucket_ts + BUCKET_SECONDS)
+                sample = min(max(sample, 0), FAST_POLL_WINDOW.total_seconds())
+                self.upload_latency += LATENCY_SMOOTHING * (sample - self.upload_latency)
+        if self._last_bucket_ts is None or latest_bucket_ts > self._last_bucket_ts:
+            self._last_bucket_ts = latest_bucket_ts
+
+    def next_interval(self, now: datetime) -> timedelta:
+        """Return the delay until the next poll."""
+        now_ts = now.timestamp()
+        boundary = self._boundary(now_ts)
+        next_poll_ts = boundary + BUCKET_SECONDS + self.upload_latency
+
+        arrived = (
+            self._last_bucket_ts is not None
+            and self._last_bucket_ts >= boundary - BUCKET_SECONDS
+        )
+        if not arrived:
+            since_boundary = now_ts - boundary
+            if since_boundary < self.upload_latency:
+                # 还没到预期的上传时间，直接等到那时
+                return max(
+                    FAST_POLL_INTERVAL,
+                    timedelta(seconds=boundary + self.upload_latency - now_ts),
+                )
+            if since_boundary < self.upload_latency + FAST_POLL_WINDOW.total_seconds():
+                return FAST_POLL_INTERVAL
+            # 数据迟迟未到：放慢轮询，但不错过下一个边界
+            return max(
+                FAST_POLL_INTERVAL,
+                min(SLOW_POLL_INTERVAL, timedelta(seconds=next_poll_ts - now_ts)),
+            )
+
+        return max(FAST_POLL_INTERVAL, timedelta(seconds=next_poll_ts - now_ts))
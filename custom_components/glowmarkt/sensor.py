@@ -1,11 +1,15 @@
 """Sensor platform for Glowmarkt integration."""
-from datetime import datetime, timezone
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.const import (
+    EntityCategory,
     UnitOfEnergy,
+    UnitOfInformation,
+    UnitOfPower,
+    UnitOfTime,
     UnitOfVolume,
 )
 from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
 from homeassistant.const import UnitOfEnergy
@@ -16,6 +20,8 @@ from .const import (
     ATTR_CUMULATIVE_USAGE,
     ATTR_UNITS,
     ATTR_TIMESTAMP,
+    ATTR_STALE_SINCE,
+    ATTR_DATA_AGE,
     CONF_RESOURCE_ID
 )
 
@@ -29,6 +35,10 @@ async def async_setup_entry(hass, entry, async_add_entities):
         GlowmarktCumulativeUsageSensor(coordinator, entry),
         GlowmarktPeriodUsageSensor(coordinator, entry)
     ]
+
+    # 周/月/年用量来自汇总缓存，不增加 API 请求
+    if coordinator.rollup is not None:
+        sensors.extend(GlowmarktRollupUsageSensor(coordinator, entry, period) for period in ROLLUP_PERIODS)
     
     # Electricity resources
     if resource_type == "kWh":
@@ -37,18 +47,39 @@ async def async_setup_entry(hass, entry, async_add_entities):
             ElectricityRateSensor(coordinator, entry),
             ElectricityCostSensor(coordinator, entry)  # Always add for electricity
         ])
+        if coordinator.rollup is not None:
+            sensors.extend(ElectricityRollupCostSensor(coordinator, entry, period) for period in ROLLUP_PERIODS)
     elif resource_type == "m³":
         sensors.append(GlowmarktVolumeSensor(coordinator, entry))
+
+    # 实时功率由独立的短周期协调器提供
+    if coordinator.power is not None:
+        sensors.append(GlowmarktPowerSensor(coordinator.power, entry))
+
+    # 诊断传感器默认禁用，需要时在实体设置中启用
+    sensors.extend([
+        GlowmarktApiRequestsSensor(coordinator, entry),
+        GlowmarktApiLatencySensor(coordinator, entry),
+        GlowmarktUpdateDurationSensor(coordinator, entry),
+        GlowmarktBytesReceivedSensor(coordinator, entry),
+    ])
         
     async_add_entities(sensors)
 
+ROLLUP_PERIODS = ("week", "month", "year")
+
+
 class GlowmarktSensor(CoordinatorEntity, SensorEntity):
     """Representation of a Glowmarkt sensor."""
 
+    # 数据年龄每次写入都不同，不进记录器
+    _unrecorded_attributes = frozenset({ATTR_DATA_AGE})
+
     def __init__(self, coordinator, entry):
         """Initialize the sensor."""
         super().__init__(coordinator)
         self._entry = entry
+        self._last_signature = None
         self._attr_device_info = {
             "identifiers": {(DOMAIN, entry.entry_id)},
             "name": f"Glowmarkt {entry.data[CONF_RESOURCE_ID]}",
@@ -61,8 +92,48 @@ class GlowmarktSensor(CoordinatorEntity, SensorEntity):
         """Return a unique ID to use for this entity."""
         return f"{self._entry.entry_id}_{self._attr_name.lower().replace(' ', '_')}"
 
+    @property
+    def extra_state_attributes(self):
+        """Return the sensor's attributes with the data's age, flagging data served from cache."""
+        attributes = self._snapshot_attributes()
+        snapshot = self.coordinator.data
+        if snapshot is None:
+            return attributes
+        attributes = dict(attributes or {})
+        age = self.coordinator.data_age(dt_util.utcnow())
+        if age is not None:
+            attributes[ATTR_DATA_AGE] = max(round(age.total_seconds()), 0)
+        if snapshot.stale:
+            attributes[ATTR_STALE_SINCE] = snapshot.fetched_at
+        return attributes or None
+
+    def _snapshot_attributes(self):
+        """Return the attributes read from the coordinator snapshot."""
+        return None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when the value or a recorded attribute changed."""
+        signature = self._state_signature()
+        if signature == self._last_signature:
+            return
+        self._last_signature = signature
+        super()._handle_coordinator_update()
+
+    def _state_signature(self):
+        """Return what a state write would change, ignoring volatile attributes.
+
+        Attributes in ``_unrecorded_attributes`` change with every bucket or
+        day; on their own they do not justify a state write, and they are
+        refreshed by the next write that does.
+        """
+        attributes = self.extra_state_attributes or {}
+        return (
+            self.available,
+            self.native_value,
+            {key: value for key, value in attributes.items() if key not in self._unrecorded_attributes},
+        )
 
-from datetime import datetime, timezone, timedelta
 
 class GlowmarktPeriodUsageSensor(GlowmarktSensor):
     """Representation of Glowmarkt 30-minute period usage sensor."""
@@ -70,62 +141,36 @@ class GlowmarktPeriodUsageSensor(GlowmarktSensor):
     _attr_name = "30 Minute Usage"
     _attr_native_unit_of_measurement = "kWh"
     _attr_device_class = SensorDeviceClass.ENERGY
+    _unrecorded_attributes = GlowmarktSensor._unrecorded_attributes | {"latest_reading_time"}
     
     def __init__(self, coordinator, entry):
         """Initialize the sensor."""
         super().__init__(coordinator, entry)
         self._last_non_zero_value = None
-        self._last_timestamp = None
+        self._last_time_text = None
     
     @property
     def native_value(self):
         """返回时间最接近当前时刻的非零值"""
-        now = datetime.now(timezone.utc).timestamp()  # 获取当前UTC时间戳
-        
-        if self.coordinator.data is None:
-            return self._last_non_zero_value or 0
-        
-        readings = self.coordinator.data.get("readings", [])
-        if not readings:
-            return self._last_non_zero_value or 0
-        
-        closest_value = None
-        closest_diff = None
-        closest_timestamp = None
-        
-        # 遍历所有读数寻找最接近的非零值
-        for timestamp, value in readings:
-            if value == 0:
-                continue
-                
-            # 计算时间差绝对值
-            time_diff = abs(timestamp - now)
-            
-            # 更新最接近的值
-            if closest_diff is None or time_diff < closest_diff:
-                closest_diff = time_diff
-                closest_value = value
-                closest_timestamp = timestamp
-        
-        # 更新最后记录值
-        if closest_value is not None:
-            self._last_non_zero_value = closest_value
-            self._last_timestamp = closest_timestamp
-            return closest_value
+        snapshot = self.coordinator.data
+        if snapshot is not None and snapshot.latest_value is not None:
+            # 更新最后记录值
+            self._last_non_zero_value = snapshot.latest_value
+            self._last_time_text = snapshot.latest_time_text
+            return snapshot.latest_value
         
         return self._last_non_zero_value or 0
     
-    @property
-    def extra_state_attributes(self):
+    def _snapshot_attributes(self):
         """返回包含UTC时间的格式化属性，格式如 21:00 (UTC)"""
-        readable_time = None
-        if self._last_timestamp is not None:
-            utc_time = datetime.fromtimestamp(self._last_timestamp, tz=timezone.utc)
-            readable_time = utc_time.strftime("%H:%M") + " (UTC)"
-        
+        snapshot = self.coordinator.data
         return {
-            "latest_reading_time": readable_time,
-            "units": self.coordinator.data.get("units", "kWh") if self.coordinator.data else "kWh"
+            "latest_reading_time": (
+                snapshot.latest_time_text
+                if snapshot is not None and snapshot.latest_time_text is not None
+                else self._last_time_text
+            ),
+            "units": snapshot.units if snapshot else "kWh"
         }
     
 class GlowmarktCumulativeUsageSensor(GlowmarktSensor):
@@ -135,47 +180,35 @@ class GlowmarktCumulativeUsageSensor(GlowmarktSensor):
     _attr_device_class = SensorDeviceClass.ENERGY
     _attr_state_class = SensorStateClass.TOTAL_INCREASING
     _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    # 每出现一个新的半小时桶都会变化
+    _unrecorded_attributes = GlowmarktSensor._unrecorded_attributes | {ATTR_TIMESTAMP}
 
     @property
     def native_value(self):
         """Return the cumulative usage."""
         if self.coordinator.data is None:
             return None
-
-        # 修改：根据资源类型返回累计值
-        if "cost" in self.coordinator.data.get("resource_type", ""):
-            return self.coordinator.data.get("cumulative_cost")
-        return self.coordinator.data.get("cumulative")
+        return self.coordinator.data.cumulative_value
 
     @property
     def native_unit_of_measurement(self):
         """Return the unit of measurement."""
-        resource_type = self.coordinator.data.get("resource_type", "kWh")
+        resource_type = self.coordinator.resource_type
         if resource_type == "m³":
             return UnitOfVolume.CUBIC_METERS
         elif resource_type == "cost":
             return "GBP"
         return UnitOfEnergy.KILO_WATT_HOUR
 
-    @property
-    def extra_state_attributes(self):
+    def _snapshot_attributes(self):
         """Return the state attributes with readable timestamp."""
-        if self.coordinator.data is None:
+        snapshot = self.coordinator.data
+        if snapshot is None:
             return None
 
-        raw_ts = self.coordinator.data.get("timestamp")
-        readable_time = None
-
-        if raw_ts is not None:
-            try:
-                dt = datetime.fromtimestamp(raw_ts, tz=timezone.utc)
-                readable_time = dt.strftime("%Y-%m-%d %H:%M (UTC)")
-            except (ValueError, TypeError):
-                readable_time = "Invalid timestamp"
-
         return {
-            ATTR_TIMESTAMP: readable_time,
-            ATTR_UNITS: self.coordinator.data.get("units"),
+            ATTR_TIMESTAMP: snapshot.timestamp_text,
+            ATTR_UNITS: snapshot.units,
         }
 
 
@@ -186,6 +219,10 @@ class ElectricityCostSensor(GlowmarktSensor):
     _attr_native_unit_of_measurement = "GBP"
     _attr_icon = "mdi:cash"
     _attr_device_class = "monetary"
+    # 随用量或时段变化的明细不进记录器，只保留电价本身
+    _unrecorded_attributes = GlowmarktSensor._unrecorded_attributes | {
+        "rate_per_kwh", "daily_usage_kwh", "cost_breakdown", "calculation_date"
+    }
 
     @property
     def available(self) -> bool:
@@ -193,53 +230,90 @@ class ElectricityCostSensor(GlowmarktSensor):
         return (
             super().available 
             and self.coordinator.data is not None
-            and self.coordinator.data.get("tariff") is not None
-            and self.coordinator.data.get("cumulative") is not None
+            and self.coordinator.data.cost is not None
         )
 
     @property
     def native_value(self):
-        """Calculate daily cost: standing charge + (usage * rate)."""
+        """Return daily cost: standing charge + (usage * rate)."""
         if not self.available:
             return None
-            
-        # Get necessary data
-        tariff = self.coordinator.data["tariff"]
-        cumulative_usage = self.coordinator.data.get("cumulative", 0)  # Total kWh
-        
-        # Convert from pence to pounds
-        standing_charge = tariff.get("currentRates", {}).get("standingCharge", 0) / 100  # GBP/day
-        rate = tariff.get("currentRates", {}).get("rate", 0) / 100  # GBP/kWh
-        
-        # Calculate total daily cost
-        # Assuming cumulative is today's usage (since coordinator filters for today)
-        total_cost = standing_charge + (cumulative_usage * rate)
-        return round(total_cost, 2)
+        return self.coordinator.data.cost
 
-    @property
-    def extra_state_attributes(self):
+    def _snapshot_attributes(self):
         """Return detailed cost breakdown."""
         if not self.available:
             return None
-            
-        tariff = self.coordinator.data["tariff"]
-        standing_charge = tariff.get("currentRates", {}).get("standingCharge", 0) / 100
-        rate = tariff.get("currentRates", {}).get("rate", 0) / 100
-        cumulative_usage = self.coordinator.data.get("cumulative", 0)
-        
-        return {
-            "standing_charge": standing_charge,
-            "rate_per_kwh": rate,
-            "daily_usage_kwh": round(cumulative_usage, 3),
-            "cost_breakdown": {
-                "standing_charge": standing_charge,
-                "usage_cost": round(cumulative_usage * rate, 2),
-            },
-            "calculation_date": datetime.now().strftime("%Y-%m-%d"),
-            "tariff_name": tariff.get("name")
-        }
+        return self.coordinator.data.cost_attributes
         
         
+class GlowmarktRollupUsageSensor(GlowmarktSensor):
+    """Usage so far this week, month or year."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, coordinator, entry, period):
+        """Initialize the sensor for ``period``."""
+        self._period = period
+        self._attr_name = f"Usage This {period.title()}"
+        super().__init__(coordinator, entry)
+        if coordinator.resource_type == "m³":
+            self._attr_native_unit_of_measurement = UnitOfVolume.CUBIC_METERS
+            self._attr_device_class = SensorDeviceClass.GAS
+        else:
+            self._attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+            self._attr_device_class = SensorDeviceClass.ENERGY
+
+    @property
+    def native_value(self):
+        """Return the period's usage."""
+        if self.coordinator.data is None:
+            return None
+        return getattr(self.coordinator.data, f"{self._period}_usage")
+
+
+class ElectricityRollupCostSensor(GlowmarktSensor):
+    """Electricity cost so far this week, month or year at the current tariff."""
+
+    _attr_native_unit_of_measurement = "GBP"
+    _attr_icon = "mdi:cash"
+    _attr_device_class = "monetary"
+
+    def __init__(self, coordinator, entry, period):
+        """Initialize the sensor for ``period``."""
+        self._period = period
+        self._attr_name = f"Electricity Cost This {period.title()}"
+        super().__init__(coordinator, entry)
+
+    @property
+    def native_value(self):
+        """Return the period's estimated cost."""
+        if self.coordinator.data is None:
+            return None
+        return getattr(self.coordinator.data, f"{self._period}_cost")
+
+
+class GlowmarktPowerSensor(GlowmarktSensor):
+    """Instantaneous power from the resource's current reading."""
+
+    _attr_name = "Power"
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfPower.WATT
+
+    @property
+    def native_value(self):
+        """Return the latest power in W."""
+        if self.coordinator.data is None:
+            return None
+        return self.coordinator.data.watts
+
+    @property
+    def extra_state_attributes(self):
+        """Return no attributes; the power lane has no cached snapshot."""
+        return None
+
+
 class GlowmarktVolumeSensor(GlowmarktSensor):
     """Representation of Glowmarkt volume sensor (gas only)."""
 
@@ -252,7 +326,7 @@ class GlowmarktVolumeSensor(GlowmarktSensor):
         if self.coordinator.data is None:
             return None
 
-        return self.coordinator.data.get("cumulative")
+        return self.coordinator.data.cumulative
         
 class ElectricityStandingChargeSensor(GlowmarktSensor):
     """Representation of Electricity Standing Charge sensor."""
@@ -264,26 +338,15 @@ class ElectricityStandingChargeSensor(GlowmarktSensor):
     @property
     def native_value(self):
         """Return the standing charge in GBP/day."""
-        if not self.coordinator.data or not self.coordinator.data.get("tariff"):
+        if not self.coordinator.data:
             return None
-            
-        # 从便士转换为英镑
-        standing_charge = self.coordinator.data["tariff"].get("currentRates", {}).get("standingCharge")
-        return round(standing_charge / 100, 2) if standing_charge is not None else None
+        return self.coordinator.data.standing_charge
     
-    @property
-    def extra_state_attributes(self):
+    def _snapshot_attributes(self):
         """Return additional tariff information."""
-        if not self.coordinator.data or not self.coordinator.data.get("tariff"):
+        if not self.coordinator.data:
             return None
-            
-        tariff = self.coordinator.data["tariff"]
-        return {
-            "tariff_name": tariff.get("name"),
-            "tariff_type": tariff.get("type"),
-            "valid_from": tariff.get("from"),
-            "source": tariff.get("source", {}).get("value")
-        }
+        return self.coordinator.data.standing_charge_attributes
 
 class ElectricityRateSensor(GlowmarktSensor):
     """Representation of Electricity Rate sensor."""
@@ -295,23 +358,127 @@ class ElectricityRateSensor(GlowmarktSensor):
     @property
     def native_value(self):
         """Return the electricity rate in GBP/kWh."""
-        if not self.coordinator.data or not self.coordinator.data.get("tariff"):
+        if not self.coordinator.data:
             return None
-            
-        # 从便士转换为英镑
-        rate = self.coordinator.data["tariff"].get("currentRates", {}).get("rate")
-        return round(rate / 100, 4) if rate is not None else None  # 保留4位小数
+        return self.coordinator.data.rate
     
-    @property
-    def extra_state_attributes(self):
+    def _snapshot_attributes(self):
         """Return tier information."""
-        if not self.coordinator.data or not self.coordinator.data.get("tariff"):
+        if not self.coordinator.data:
             return None
-            
-        plan_details = self.coordinator.data["tariff"].get("plan", [{}])[0].get("planDetail", [])
-        tiers = {}
-        for detail in plan_details:
-            if "rate" in detail:
-                tiers[f"tier_{detail.get('tier', 1)}"] = detail["rate"] / 100  # 转换为GBP
-        
-        return tiers
+        return self.coordinator.data.rate_attributes
+
+
+class GlowmarktDiagnosticSensor(GlowmarktSensor):
+    """Base class for disabled-by-default polling diagnostics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    @property
+    def extra_state_attributes(self):
+        """Return the diagnostic attributes."""
+        return self._snapshot_attributes()
+
+    def _state_signature(self):
+        """Return the value alone; every diagnostic attribute is volatile."""
+        return self.available, self.native_value
+
+
+class GlowmarktApiRequestsSensor(GlowmarktDiagnosticSensor):
+    """Requests sent to the Glowmarkt API by this account."""
+
+    _attr_name = "API Requests"
+    _attr_icon = "mdi:api"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _unrecorded_attributes = frozenset(
+        {"requests", "errors", "unauthorized", "rate_limited", "retries", "catchup_runs"}
+    )
+
+    @property
+    def native_value(self):
+        """Return the number of requests sent."""
+        return self.coordinator.client.metrics.total_requests
+
+    def _snapshot_attributes(self):
+        """Return per-endpoint and error counters."""
+        metrics = self.coordinator.client.metrics
+        return {
+            "requests": dict(metrics.requests),
+            "errors": metrics.errors,
+            "unauthorized": metrics.unauthorized,
+            "rate_limited": metrics.rate_limited,
+            "retries": metrics.retries,
+            "catchup_runs": self.coordinator.metrics.catchup_runs,
+        }
+
+
+class GlowmarktApiLatencySensor(GlowmarktDiagnosticSensor):
+    """95th percentile latency of the account's slowest endpoint."""
+
+    _attr_name = "API Latency"
+    _attr_icon = "mdi:timer-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    # 属性按接口名分组
+    _unrecorded_attributes = frozenset({"auth", "resource", "readings", "catchup", "tariff", "current"})
+
+    @property
+    def native_value(self):
+        """Return the p95 latency in milliseconds."""
+        p95 = self.coordinator.client.metrics.latency_quantile(0.95)
+        return round(p95 * 1000) if p95 is not None else None
+
+    def _snapshot_attributes(self):
+        """Return mean and maximum latency per endpoint in milliseconds."""
+        return {
+            endpoint: {
+                "mean": round(histogram.mean * 1000, 1),
+                "max": round(histogram.max * 1000, 1),
+            }
+            for endpoint, histogram in self.coordinator.client.metrics.latency.items()
+            if histogram.count
+        }
+
+
+class GlowmarktUpdateDurationSensor(GlowmarktDiagnosticSensor):
+    """Duration of this resource's last coordinator update."""
+
+    _attr_name = "Update Duration"
+    _attr_icon = "mdi:timer-sand"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _unrecorded_attributes = frozenset({"updates", "failures", "mean_duration_ms", "tariff_cache_hits"})
+
+    @property
+    def native_value(self):
+        """Return the last update duration in milliseconds."""
+        duration = self.coordinator.metrics.last_duration
+        return round(duration * 1000) if duration is not None else None
+
+    def _snapshot_attributes(self):
+        """Return update counters and tariff cache hits."""
+        metrics = self.coordinator.metrics
+        return {
+            "updates": metrics.duration.count,
+            "failures": metrics.failures,
+            "mean_duration_ms": round(metrics.duration.mean * 1000) if metrics.duration.count else None,
+            "tariff_cache_hits": self.coordinator.tariff_cache.hits,
+        }
+
+
+class GlowmarktBytesReceivedSensor(GlowmarktDiagnosticSensor):
+    """Response bytes received from the Glowmarkt API by this account."""
+
+    _attr_name = "Data Received"
+    _attr_icon = "mdi:download-network"
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self):
+        """Return the bytes received."""
+        return self.coordinator.client.metrics.bytes_received
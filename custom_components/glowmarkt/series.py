@@ -0,0 +1,96 @@
+"""Compact array-backed series of half-hour readings."""
+from array import array
+from bisect import bisect_left
+
+
+class ReadingSeries:
+    """Readings stored as parallel ``array('d')`` timestamps and values.
+
+    Timestamps are kept sorted so lookups by time use bisect. The total and
+    the position of the newest non-zero bucket are maintained on every write,
+    so sensors read them in constant time.
+    """
+
+    __slots__ = ("timestamps", "values", "_total", "_latest_index")
+
+    def __init__(self):
+        """Initialize an empty series."""
+        self.timestamps = array("d")
+        self.values = array("d")
+        self._total = 0.0
+        self._latest_index = -1
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build a series from ``(timestamp, value)`` pairs in any order."""
+        series = cls()
+        for ts, value in sorted(pairs):
+            series.set(ts, value)
+        return series
+
+    def __len__(self):
+        """Return the number of buckets."""
+        return len(self.timestamps)
+
+    def __eq__(self, other):
+        """Return True if both series hold the same buckets and values."""
+        if not isinstance(other, ReadingSeries):
+            return NotImplemented
+        return self.timestamps == other.timestamps and self.values == other.values
+
+    def __iter__(self):
+        """Yield ``(timestamp, value)`` pairs in time order."""
+        return zip(self.timestamps, self.values)
+
+    def set(self, ts, value):
+        """Insert or replace the value of the bucket at ``ts``."""
+        value = float(value or 0)
+        index = bisect_left(self.timestamps, ts)
+        if index < len(self.timestamps) and self.timestamps[index] == ts:
+            self._total += value - self.values[index]
+            self.values[index] = value
+        else:
+            self.timestamps.insert(index, ts)
+            self.values.insert(index, value)
+            self._total += value
+            if self._latest_index >= index:
+                self._latest_index += 1
+
+        if value and index > self._latest_index:
+            self._latest_index = index
+        elif not value and index == self._latest_index:
+            # 最新非零桶被改成 0，向前找上一个非零桶
+            self._latest_index = -1
+            for i in range(index - 1, -1, -1):
+                if self.values[i]:
+                    self._latest_index = i
+                    break
+
+    @property
+    def total(self):
+        """Return the sum of all buckets."""
+        return self._total
+
+    @property
+    def last_timestamp(self):
+        """Return the newest bucket timestamp, or None."""
+        return self.timestamps[-1] if self.timestamps else None
+
+    def latest_nonzero(self):
+        """Return ``(timestamp, value)`` of the newest non-zero bucket, or None."""
+        if self._latest_index < 0:
+            return None
+        return self.timestamps[self._latest_index], self.values[self._latest_index]
+
+    def value_at(self, ts):
+        """Return the value of the bucket starting at ``ts``, or None."""
+        index = bisect_left(self.timestamps, ts)
+        if index < len(self.timestamps) and self.timestamps[index] == ts:
+            return self.values[index]
+        return None
+
+    def sum_between(self, start_ts, end_ts):
+        """Return the sum of buckets with ``start_ts <= timestamp < end_ts``."""
+        lo = bisect_left(self.timestamps, start_ts)
+        hi = bisect_left(self.timestamps, end_ts)
+        return sum(self.values[lo:hi])
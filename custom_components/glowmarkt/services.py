@@ -0,0 +1,110 @@
+"""Services for the Glowmarkt integration."""
+import logging
+import os
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .backfill import StatisticsBackfill
+from .export import ReadingsExport
+from .const import (
+    DOMAIN,
+    DATA_EXPORTS,
+    SERVICE_BACKFILL_STATISTICS,
+    SERVICE_EXPORT_READINGS,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_START_DATE,
+    ATTR_END_DATE,
+    ATTR_RESUME,
+    ATTR_FILENAME,
+    ATTR_FORMAT,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMATS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+BACKFILL_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+        vol.Optional(ATTR_RESUME, default=True): cv.boolean,
+    }
+)
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+        vol.Required(ATTR_FILENAME): cv.string,
+        vol.Optional(ATTR_FORMAT, default=EXPORT_FORMAT_CSV): vol.In(EXPORT_FORMATS),
+        vol.Optional(ATTR_RESUME, default=True): cv.boolean,
+    }
+)
+
+
+def _get_coordinator(hass: HomeAssistant, entry_id):
+    """Return the coordinator for a loaded config entry."""
+    coordinator = hass.data.get(DOMAIN, {}).get(entry_id)
+    if coordinator is None:
+        raise HomeAssistantError(f"Glowmarkt entry {entry_id} is not loaded")
+    return coordinator
+
+
+def async_setup_services(hass: HomeAssistant):
+    """Register the Glowmarkt services once."""
+    if hass.services.has_service(DOMAIN, SERVICE_BACKFILL_STATISTICS):
+        return
+
+    async def async_backfill_statistics(call: ServiceCall):
+        """Start a historical backfill in the background."""
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        coordinator = _get_coordinator(hass, entry_id)
+        if coordinator.backfill_task is not None and not coordinator.backfill_task.done():
+            raise HomeAssistantError("A backfill is already running for this entry")
+
+        start = dt_util.start_of_local_day(call.data[ATTR_START_DATE])
+        end_date = call.data.get(ATTR_END_DATE)
+        end = dt_util.start_of_local_day(end_date) if end_date else dt_util.utcnow()
+
+        backfill = StatisticsBackfill(hass, coordinator)
+        coordinator.backfill_task = coordinator.entry.async_create_background_task(
+            hass,
+            backfill.async_run(
+                dt_util.as_utc(start), dt_util.as_utc(end), resume=call.data[ATTR_RESUME]
+            ),
+            f"{DOMAIN} backfill {entry_id}",
+        )
+
+    async def async_export_readings(call: ServiceCall):
+        """Start a half-hour readings export in the background."""
+        coordinators = [_get_coordinator(hass, entry_id) for entry_id in call.data[ATTR_CONFIG_ENTRY_ID]]
+        path = os.path.realpath(hass.config.path(call.data[ATTR_FILENAME]))
+        # 默认允许写入配置目录内，其他目录需要在 allowlist_external_dirs 中
+        in_config_dir = path.startswith(os.path.join(os.path.realpath(hass.config.config_dir), ""))
+        if not in_config_dir and not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Writing to {path} is not allowed")
+        exports = hass.data[DOMAIN].setdefault(DATA_EXPORTS, {})
+        if path in exports and not exports[path].done():
+            raise HomeAssistantError(f"An export to {path} is already running")
+
+        start = dt_util.start_of_local_day(call.data[ATTR_START_DATE])
+        end_date = call.data.get(ATTR_END_DATE)
+        end = dt_util.start_of_local_day(end_date) if end_date else dt_util.utcnow()
+
+        export = ReadingsExport(hass, coordinators, path, call.data[ATTR_FORMAT])
+        exports[path] = hass.async_create_background_task(
+            export.async_run(dt_util.as_utc(start), dt_util.as_utc(end), resume=call.data[ATTR_RESUME]),
+            f"{DOMAIN} export {path}",
+        )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL_STATISTICS, async_backfill_statistics, schema=BACKFILL_SCHEMA
+    )
+    hass.services.async_register(DOMAIN, SERVICE_EXPORT_READINGS, async_export_readings, schema=EXPORT_SCHEMA)
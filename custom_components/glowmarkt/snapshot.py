@@ -0,0 +1,165 @@
+"""Immutable per-update snapshot of everything the sensors display."""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from homeassistant.util import dt as dt_util
+
+from .pricing import RateSchedule, compile_schedule
+from .rollup import RollupTotals
+from .series import ReadingSeries
+
+
+@dataclass(frozen=True, slots=True)
+class GlowmarktSnapshot:
+    """Coordinator data with every derived value precomputed.
+
+    Built once per coordinator update so sensor properties, which Home
+    Assistant reads several times per state write, are plain attribute reads.
+    Snapshots compare equal when every displayed value is the same, which
+    lets the coordinator skip notifying its sensors.
+    """
+
+    readings: ReadingSeries
+    units: str
+    resource_type: str
+    cumulative: float
+    cumulative_value: float | None
+    timestamp: float | None
+    timestamp_text: str | None
+    latest_value: float | None
+    latest_time_text: str | None
+    tariff: dict | None
+    standing_charge: float | None
+    rate: float | None
+    cost: float | None
+    cost_attributes: dict | None
+    standing_charge_attributes: dict | None
+    rate_attributes: dict | None
+    fetched_at: str | None = field(default=None, compare=False)
+    stale: bool = False
+    week_usage: float | None = None
+    month_usage: float | None = None
+    year_usage: float | None = None
+    week_cost: float | None = None
+    month_cost: float | None = None
+    year_cost: float | None = None
+
+
+def build_snapshot(
+    readings: ReadingSeries,
+    units,
+    resource_type,
+    tariff=None,
+    fetched_at=None,
+    rollup: RollupTotals | None = None,
+    schedule: RateSchedule | None = None,
+    usage_cost=None,
+) -> GlowmarktSnapshot:
+    """Derive all sensor values from one update's readings, tariff and rollup totals.
+
+    ``schedule`` and ``usage_cost`` let the coordinator pass the compiled
+    tariff and the incrementally maintained cost of the day's buckets; when
+    omitted they are derived from ``tariff`` and ``readings``.
+    """
+    cumulative = readings.total
+    timestamp = readings.last_timestamp
+
+    timestamp_text = None
+    if timestamp is not None:
+        try:
+            timestamp_text = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M (UTC)")
+        except (ValueError, TypeError, OverflowError):
+            timestamp_text = "Invalid timestamp"
+
+    latest_value = None
+    latest_time_text = None
+    latest = readings.latest_nonzero()
+    if latest is not None:
+        latest_ts, latest_value = latest
+        latest_time_text = datetime.fromtimestamp(latest_ts, tz=timezone.utc).strftime("%H:%M") + " (UTC)"
+
+    standing_charge = rate = cost = None
+    cost_attributes = standing_charge_attributes = rate_attributes = None
+    if tariff is not None:
+        if schedule is None:
+            schedule = compile_schedule(tariff)
+        if usage_cost is None:
+            usage_cost = schedule.usage_cost(readings)
+
+        current_rates = tariff.get("currentRates", {})
+        # 从便士转换为英镑
+        raw_standing_charge = current_rates.get("standingCharge")
+        standing_charge = round(raw_standing_charge / 100, 2) if raw_standing_charge is not None else None
+        # 当前时段的电价来自编译好的时段表，时段切换不需要重新请求电价
+        day_rate = schedule.rate_at(dt_util.utcnow().timestamp())  # GBP/kWh
+        rate = round(day_rate, 4)
+
+        day_standing_charge = schedule.standing_charge  # GBP/day
+        cost = round(day_standing_charge + usage_cost, 2)
+        cost_attributes = {
+            "standing_charge": day_standing_charge,
+            "rate_per_kwh": day_rate,
+            "time_of_use": schedule.time_of_use,
+            "daily_usage_kwh": round(cumulative, 3),
+            "cost_breakdown": {
+                "standing_charge": day_standing_charge,
+                "usage_cost": round(usage_cost, 2),
+            },
+            "calculation_date": datetime.now().strftime("%Y-%m-%d"),
+            "tariff_name": tariff.get("name"),
+        }
+        standing_charge_attributes = {
+            "tariff_name": tariff.get("name"),
+            "tariff_type": tariff.get("type"),
+            "valid_from": tariff.get("from"),
+            "source": tariff.get("source", {}).get("value"),
+        }
+        rate_attributes = {
+            f"tier_{detail.get('tier', 1)}": detail["rate"] / 100  # 转换为GBP
+            for detail in tariff.get("plan", [{}])[0].get("planDetail", [])
+            if "rate" in detail
+        }
+
+    period_usage = {}
+    period_cost = {}
+    if rollup is not None:
+        # 今天的用量来自半小时缓冲，之前的天来自汇总缓存
+        for period, completed, days in (
+            ("week", rollup.week, rollup.week_days),
+            ("month", rollup.month, rollup.month_days),
+            ("year", rollup.year, rollup.year_days),
+        ):
+            usage = completed + cumulative
+            period_usage[period] = round(usage, 3)
+            if schedule is not None:
+                # 之前的天只有日总量，按全天平均电价估算；今天按时段精确计算
+                period_cost[period] = round(
+                    completed * schedule.mean_rate + usage_cost + schedule.standing_charge * (days + 1), 2
+                )
+
+    return GlowmarktSnapshot(
+        readings=readings,
+        units=units,
+        resource_type=resource_type,
+        cumulative=cumulative,
+        # 成本资源没有 cumulative_cost 数据，保持原来返回 None 的行为
+        cumulative_value=None if "cost" in resource_type else cumulative,
+        timestamp=timestamp,
+        timestamp_text=timestamp_text,
+        latest_value=latest_value,
+        latest_time_text=latest_time_text,
+        tariff=tariff,
+        standing_charge=standing_charge,
+        rate=rate,
+        cost=cost,
+        cost_attributes=cost_attributes,
+        standing_charge_attributes=standing_charge_attributes,
+        rate_attributes=rate_attributes,
+        fetched_at=fetched_at or dt_util.utcnow().isoformat(),
+        week_usage=period_usage.get("week"),
+        month_usage=period_usage.get("month"),
+        year_usage=period_usage.get("year"),
+        week_cost=period_cost.get("week"),
+        month_cost=period_cost.get("month"),
+        year_cost=period_cost.get("year"),
+    )
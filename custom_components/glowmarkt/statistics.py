@@ -0,0 +1,151 @@
+"""Write settled half-hour usage into recorder external statistics."""
+import logging
+from datetime import datetime, timezone
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData
+from homeassistant.components.recorder.statistics import async_add_external_statistics, get_last_statistics
+from homeassistant.core import HomeAssistant, callback
+
+from .backfill import statistic_id_for, statistic_metadata
+from .const import BUCKET_SECONDS, SLOTS_PER_DAY, STATISTICS_LOOKBACK
+
+_LOGGER = logging.getLogger(__name__)
+
+_HOUR_SECONDS = 2 * BUCKET_SECONDS
+
+
+def _rounded(value):
+    """Round a statistic value so float noise does not count as a change."""
+    return round(value, 6)
+
+
+class StatisticsWriter:
+    """Keep a resource's hourly usage statistics in step with its day buffer.
+
+    After each poll the day's hours are folded from the half-hour buffer and
+    compared with what was last written; only hours whose usage or running
+    sum changed are sent, together in one import job that the recorder runs
+    on its own thread. A late bucket therefore rewrites its hour and the
+    sums of the hours after it, not the whole day. The running sum continues
+    from the last statistic before the day, which is read from the recorder
+    once and then carried over from one day to the next.
+
+    Days are calendar days starting at UTC midnight. The day buffer can
+    reach past them: the look-back window before 00:35 holds yesterday and
+    today's first buckets. Only the slots inside the writer's day are
+    folded, and the sum moves on only when that day is closed.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator):
+        """Initialize the writer."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self.statistic_id = statistic_id_for(coordinator.resource_id)
+        self._day_start_ts = None
+        self._base_sum = None  # 当天第一个小时之前的累计值
+        self._written = {}  # 小时时间戳 -> (用量, 累计值)
+        self.batches = 0
+        self.rows = 0
+
+    @property
+    def enabled(self):
+        """Return True when the recorder is running."""
+        return "recorder" in self._hass.config.components
+
+    @callback
+    def async_reset(self):
+        """Forget what was written so the next update re-reads the recorder."""
+        self._day_start_ts = None
+        self._base_sum = None
+        self._written = {}
+
+    async def _async_load(self, day_start_ts):
+        """Read the sum before the day and the day's written hours from the recorder."""
+        result = await get_instance(self._hass).async_add_executor_job(
+            get_last_statistics, self._hass, STATISTICS_LOOKBACK, self.statistic_id, False, {"state", "sum"}
+        )
+        self._day_start_ts = day_start_ts
+        self._base_sum = 0.0
+        self._written = {}
+        for row in result.get(self.statistic_id, []):
+            start = row["start"]
+            if start < day_start_ts:
+                # 行按时间倒序，第一个早于当天的就是基准
+                self._base_sum = row["sum"] or 0.0
+                break
+            self._written[int(start)] = (_rounded(row["state"] or 0), _rounded(row["sum"] or 0))
+
+    def _hours(self, day, final):
+        """Return ``(hour_ts, usage, sum)`` for the settled hours of the writer's day."""
+        last_settled_ts = day.last_settled_ts()
+        if last_settled_ts is None:
+            return []
+        day_end_ts = self._day_start_ts + SLOTS_PER_DAY * BUCKET_SECONDS
+        hours = {}
+        for slot, value in enumerate(day.values):
+            ts = day.base_ts + slot * BUCKET_SECONDS
+            if not self._day_start_ts <= ts < day_end_ts:
+                # 回看窗口中属于其他日历日的槽位
+                continue
+            hours[ts - ts % _HOUR_SECONDS] = hours.get(ts - ts % _HOUR_SECONDS, 0.0) + float(value or 0)
+
+        rows = []
+        running_sum = self._base_sum
+        for hour_ts in sorted(hours):
+            # 小时内最新的半小时到达后才算结束；一天结束时写完所有小时
+            if not final and hour_ts + _HOUR_SECONDS > last_settled_ts + BUCKET_SECONDS:
+                break
+            running_sum += hours[hour_ts]
+            rows.append((hour_ts, _rounded(hours[hour_ts]), _rounded(running_sum)))
+        return rows
+
+    @callback
+    def _async_write(self, day, final=False):
+        """Send the hours that changed since the last write in one batch."""
+        changed = [
+            (hour_ts, usage, total)
+            for hour_ts, usage, total in self._hours(day, final)
+            if self._written.get(hour_ts) != (usage, total)
+        ]
+        if not changed:
+            return
+        async_add_external_statistics(
+            self._hass,
+            statistic_metadata(self._coordinator),
+            [
+                StatisticData(start=datetime.fromtimestamp(hour_ts, tz=timezone.utc), state=usage, sum=total)
+                for hour_ts, usage, total in changed
+            ],
+        )
+        for hour_ts, usage, total in changed:
+            self._written[hour_ts] = (usage, total)
+        self.batches += 1
+        self.rows += len(changed)
+
+    async def async_update(self, day_start_ts, day):
+        """Write the day buffer's new and corrected hours."""
+        if not self.enabled:
+            return
+        if self._base_sum is None or self._day_start_ts != day_start_ts:
+            await self._async_load(day_start_ts)
+        self._async_write(day)
+
+    @callback
+    def async_close_day(self, day_start_ts, day, next_day_start_ts):
+        """Write the final hours of a finished day and continue the sum into the next."""
+        if not self.enabled or self._base_sum is None or self._day_start_ts != day_start_ts:
+            return
+        self._async_write(day, final=True)
+        if self._written:
+            self._base_sum = self._written[max(self._written)][1]
+        self._day_start_ts = next_day_start_ts
+        self._written = {}
+
+    def as_dict(self):
+        """Return the writer's counters as plain data."""
+        return {
+            "statistic_id": self.statistic_id,
+            "batches": self.batches,
+            "rows": self.rows,
+        }
@@ -0,0 +1,28 @@
+"""Local persistence of readings so setup can warm start."""
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, READINGS_STORAGE_VERSION, READINGS_SAVE_DELAY
+
+
+class ReadingStore:
+    """Persist one resource's day buffer between restarts.
+
+    Writes are coalesced with ``async_delay_save``, so a burst of updates
+    results in a single write of the latest snapshot.
+    """
+
+    def __init__(self, hass: HomeAssistant, resource_id):
+        """Initialize the store."""
+        self._store = Store(hass, READINGS_STORAGE_VERSION, f"{DOMAIN}.readings_{resource_id}")
+        self._snapshot = None
+
+    async def async_load(self):
+        """Return the last saved snapshot, or None."""
+        return await self._store.async_load()
+
+    @callback
+    def async_schedule_save(self, snapshot):
+        """Save a snapshot after a short delay."""
+        self._snapshot = snapshot
+        self._store.async_delay_save(lambda: self._snapshot, READINGS_SAVE_DELAY)
@@ -0,0 +1,148 @@
+"""Persistent tariff cache for Glowmarkt resources."""
+import logging
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import GlowmarktApiClient
+from .const import DOMAIN, BUCKET_SECONDS, TARIFF_STORAGE_VERSION, TARIFF_RETRY_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _parse_from(value):
+    """Parse a tariff ``from`` value as an aware UTC datetime."""
+    if not value:
+        return None
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_util.UTC)
+    return parsed
+
+
+def _follows_current_rate(tariff):
+    """Return True for a plan whose rate changes in the day without ``startTime``/``endTime`` windows.
+
+    Only ``currentRates`` tells which of its tiers applies, so it goes out of
+    date at every half-hour boundary.
+    """
+    details = (tariff.get("plan") or [{}])[0].get("planDetail", [])
+    rates = {detail.get("rate") for detail in details if detail.get("rate") is not None}
+    has_windows = any(detail.get("startTime") and detail.get("endTime") for detail in details)
+    return len(rates) > 1 and not has_windows
+
+
+class TariffCache:
+    """Serve a resource's tariff without hitting the API on every poll.
+
+    Tariffs are refreshed when the TTL runs out or when a tariff's ``from``
+    boundary passes, using conditional requests so an unchanged tariff costs
+    only a 304. Time-of-use plans without windows are refreshed at every
+    half-hour boundary instead, since their current rate may change there.
+    The last good tariff is kept in storage and served whenever a refresh
+    fails.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: GlowmarktApiClient, resource_id, ttl: timedelta):
+        """Initialize the cache."""
+        self._client = client
+        self._resource_id = resource_id
+        self._ttl = ttl
+        self._store = Store(hass, TARIFF_STORAGE_VERSION, f"{DOMAIN}.tariff_{resource_id}")
+        self._loaded = False
+        self._body = None
+        self._etag = None
+        self._last_modified = None
+        self._expires_at = None
+        self.hits = 0
+        self.not_modified = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def as_dict(self):
+        """Return the cache counters and state for diagnostics."""
+        return {
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "expires_at": self._expires_at.isoformat() if self._expires_at else None,
+            "has_etag": self._etag is not None,
+        }
+
+    async def _async_load(self):
+        """Restore the cached tariff from storage."""
+        self._loaded = True
+        stored = await self._store.async_load()
+        if not stored:
+            return
+        self._body = stored.get("body")
+        self._etag = stored.get("etag")
+        self._last_modified = stored.get("last_modified")
+        self._expires_at = dt_util.parse_datetime(stored.get("expires_at") or "")
+
+    def _compute_expiry(self, now):
+        """Expire at the end of the TTL, the next tariff ``from`` boundary or the next half hour."""
+        expires_at = now + self._ttl
+        for tariff in (self._body or {}).get("data", []):
+            valid_from = _parse_from(tariff.get("from"))
+            if valid_from is not None and now < valid_from < expires_at:
+                expires_at = valid_from
+            if _follows_current_rate(tariff):
+                # 没有时段的分时电价只能从 currentRates 得知当前费率
+                next_bucket = now.timestamp() // BUCKET_SECONDS * BUCKET_SECONDS + BUCKET_SECONDS
+                expires_at = min(expires_at, dt_util.utc_from_timestamp(next_bucket))
+        return expires_at
+
+    async def async_cached(self):
+        """Return the stored tariff response without contacting the API."""
+        if not self._loaded:
+            await self._async_load()
+        return self._body
+
+    async def async_get(self):
+        """Return the raw tariff response, refreshing it when due."""
+        if not self._loaded:
+            await self._async_load()
+
+        now = dt_util.utcnow()
+        if self._body is not None and self._expires_at is not None and now < self._expires_at:
+            self.hits += 1
+            return self._body
+
+        try:
+            body, etag, last_modified = await self._client.get_tariff_conditional(
+                self._resource_id, self._etag, self._last_modified
+            )
+        except Exception as err:
+            self.failures += 1
+            if self._body is None:
+                raise
+            # 刷新失败：继续使用上一次的电价，稍后重试
+            _LOGGER.warning(f"Failed to refresh tariff, serving cached copy: {err}")
+            self._expires_at = now + TARIFF_RETRY_INTERVAL
+            return self._body
+
+        if body is None:
+            _LOGGER.debug("Tariff for %s not modified", self._resource_id)
+            self.not_modified += 1
+        else:
+            self._body = body
+            self.refreshes += 1
+        self._etag = etag
+        self._last_modified = last_modified
+        self._expires_at = self._compute_expiry(now)
+
+        await self._store.async_save(
+            {
+                "body": self._body,
+                "etag": self._etag,
+                "last_modified": self._last_modified,
+                "expires_at": self._expires_at.isoformat(),
+            }
+        )
+        return self._body